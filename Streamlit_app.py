@@ -1,17 +1,26 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import hashlib
+import io
+import os
+import threading
 import time
+from collections import OrderedDict
 from scipy import stats
 import plotly.graph_objects as go
 import plotly.express as px
 
 # Importar módulos del proyecto
-from src.data_loader import load_customer_data, get_simulation_scenarios, setup_problem_instance
+from src.data_loader import load_customer_data, get_simulation_scenarios, setup_problem_instance, \
+    generate_instance, load_vrp_file, INSTANCE_KINDS
 from src.utils import calculate_solution_cost, plot_routes
 from src.algorithms.cws import run_cws
 from src.algorithms.ga import GeneticAlgorithm
 from src.algorithms.h_aco import HybridACO
+from src.algorithms.profiling import Profiler
+from src.experiment import iter_stored_experiment
+from src.experiment_store import ExperimentStore
 
 # Configuración de la página
 st.set_page_config(layout="wide", page_title="Optimización CVRP (H-ACO)")
@@ -19,10 +28,20 @@ st.set_page_config(layout="wide", page_title="Optimización CVRP (H-ACO)")
 st.title("Panel de Control: Optimización de Rutas (CVRP)")
 st.write("Análisis comparativo de H-ACO (Propuesto) vs. GA y CWS para el caso de estudio.")
 
+# Entradas en memoria entre ejecuciones del script (Streamlit reejecuta todo en cada interacción)
+INSTANCE_CACHE_SIZE = 16 # Instancias preparadas
+RESULT_CACHE_SIZE = 64   # Resultados de corridas (LRU)
+EXPERIMENT_DB = 'experiments.db' # Corridas del experimento estadístico (SQLite, persistente)
+MAP_MAX_POINTS = 5000 # Paradas dibujadas por mapa como máximo (diezmado en instancias grandes)
+
+@st.cache_resource
+def load_data():
+    """Clientes y escenarios (una sola vez; el mismo DataFrame en cada ejecución)."""
+    return load_customer_data(), get_simulation_scenarios()
+
 # --- Cargar Datos Globales ---
 try:
-    all_customers_df = load_customer_data()
-    scenarios = get_simulation_scenarios()
+    all_customers_df, scenarios = load_data()
     scenario_names = list(scenarios.keys())
 except Exception as e:
     st.error(f"Error cargando los datos: {e}")
@@ -35,16 +54,25 @@ st.sidebar.header("Configuración de Simulación")
 
 # --- Sección 1: Simulación Única (Visual) ---
 st.sidebar.markdown("### 1. Ejecución Visual Única")
+SYNTHETIC_OPTION = "Sintética (generada)"
+VRP_FILE_OPTION = "Archivo CVRPLIB (.vrp)"
 selected_scenario_name = st.sidebar.selectbox(
     "Seleccionar Simulación (Instancia)",
-    scenario_names,
+    scenario_names + [SYNTHETIC_OPTION, VRP_FILE_OPTION],
     index=2 # Default a S-3 por ser la más compleja
 )
+if selected_scenario_name == SYNTHETIC_OPTION:
+    synthetic_n = st.sidebar.number_input("Número de Clientes", min_value=5, max_value=10000, value=100)
+    synthetic_kind = st.sidebar.selectbox("Tipo de Instancia", INSTANCE_KINDS)
+    synthetic_seed = st.sidebar.number_input("Semilla de la Instancia", min_value=0, value=0)
+elif selected_scenario_name == VRP_FILE_OPTION:
+    vrp_file = st.sidebar.file_uploader("Instancia CVRPLIB", type=['vrp'])
 
 col_cws, col_ga, col_haco = st.sidebar.columns(3)
 run_cws_flag = col_cws.checkbox("CWS", value=True)
 run_ga_flag = col_ga.checkbox("GA", value=True)
 run_haco_flag = col_haco.checkbox("H-ACO", value=True)
+visual_seed = st.sidebar.number_input("Semilla de la Ejecución", min_value=0, value=0)
 
 start_single_run = st.sidebar.button("INICIAR EJECUCIÓN VISUAL", type="primary")
 
@@ -57,33 +85,141 @@ n_ants = st.sidebar.number_input("Hormigas (n_ants)", min_value=1, value=20)
 alpha = st.sidebar.slider("Influencia Feromona (α)", 0.1, 5.0, 1.0, 0.1)
 beta = st.sidebar.slider("Influencia Heurística (β)", 0.1, 10.0, 5.0, 0.1)
 rho = st.sidebar.slider("Tasa Evaporación (ρ)", 0.01, 0.5, 0.1, 0.01)
+warm_start = st.sidebar.checkbox("Arranque en caliente desde CWS", value=False)
+warm_start_params = {'initial_solution': 'cws'} if warm_start else {}
 
 # Parámetros GA (simplificado)
 ga_generations = n_iterations # Usar el mismo número de iteraciones
 ga_pop_size = n_ants * 2      # Usar una población comparable
 
+# Criterios de parada adicionales (GA y H-ACO); 0 = sin límite
+time_limit = st.sidebar.number_input("Límite de Tiempo por Corrida (seg, 0 = sin límite)", min_value=0.0, value=0.0)
+stagnation_limit = st.sidebar.number_input("Iteraciones sin Mejora (0 = sin límite)", min_value=0, value=0)
+stopping_params = {
+    'time_limit': time_limit or None,
+    'stagnation_limit': stagnation_limit or None
+}
+show_profile = st.sidebar.checkbox("Mostrar desglose por fase (instrumentación)", value=False)
+
 st.sidebar.divider()
 
 # --- Sección 3: Experimento Robusto (Paso 4) ---
 st.sidebar.markdown("### 3. Experimento Robusto (Paso 4)")
 n_runs = st.sidebar.number_input("Número de Corridas (N)", min_value=1, value=10) # Default 10 para rapidez, cambiar a 30
+base_seed = st.sidebar.number_input("Semilla Base", min_value=0, value=0)
+n_workers = st.sidebar.number_input("Procesos en Paralelo", min_value=1, value=os.cpu_count() or 1)
 run_statistical_experiment = st.sidebar.button("INICIAR EXPERIMENTO ESTADÍSTICO")
 
 # ==============================================================================
 # LÓGICA PRINCIPAL
 # ==============================================================================
 
+def convergence_row(snap):
+    """Fila del gráfico de convergencia a partir de un resumen de iter_run()."""
+    return pd.DataFrame({'Mejor': [snap['best_cost']], 'Media': [snap['mean_cost']]}, index=[snap['iteration']])
+
+def show_profile_breakdown(run_stats):
+    """Expander con los tiempos por fase y los contadores de una corrida instrumentada."""
+    profile = run_stats.get('profile')
+    if not profile:
+        return
+    with st.expander("Desglose por fase"):
+        phases = pd.DataFrame.from_dict(profile['phases'], orient='index')
+        phases['ms/llamada'] = 1000 * phases['time'] / phases['calls']
+        st.dataframe(phases.rename(columns={'time': 'seg', 'calls': 'llamadas'}).style.format(
+            {'seg': '{:.3f}', 'ms/llamada': '{:.3f}'}
+        ))
+        if profile['counters']:
+            st.dataframe(pd.Series(profile['counters'], name='total'))
+
+# --- Caché de instancias y resultados ---
+
+@st.cache_resource(max_entries=INSTANCE_CACHE_SIZE)
+def scenario_instance(scenario_name):
+    customers_df, all_scenarios = load_data()
+    return setup_problem_instance(customers_df, all_scenarios[scenario_name])
+
+@st.cache_resource(max_entries=INSTANCE_CACHE_SIZE)
+def synthetic_instance(n_customers, kind, seed):
+    return generate_instance(n_customers, kind, seed=seed)
+
+@st.cache_resource(max_entries=INSTANCE_CACHE_SIZE)
+def vrp_instance(file_bytes):
+    return load_vrp_file(io.BytesIO(file_bytes))
+
+@st.cache_resource
+def get_experiment_store():
+    return ExperimentStore(EXPERIMENT_DB)
+
+@st.cache_resource
+def get_result_cache():
+    """Caché LRU de resultados (compartida entre ejecuciones del script y sesiones)."""
+    return {'lock': threading.Lock(), 'entries': OrderedDict()}
+
+def result_key(algorithm, params, seed):
+    """Clave (instancia, algoritmo, parámetros, semilla) de un resultado."""
+    return (instance_key, algorithm, tuple(sorted(params.items())), seed)
+
+def cached_result(key):
+    cache = get_result_cache()
+    with cache['lock']:
+        if key not in cache['entries']:
+            return None
+        cache['entries'].move_to_end(key) # Usado recientemente
+        return cache['entries'][key]
+
+def store_result(key, result):
+    cache = get_result_cache()
+    with cache['lock']:
+        cache['entries'][key] = result
+        cache['entries'].move_to_end(key)
+        while len(cache['entries']) > RESULT_CACHE_SIZE:
+            cache['entries'].popitem(last=False) # Descartar el menos usado
+
+def run_with_live_chart(solver):
+    """Ejecuta un GA / H-ACO dibujando la convergencia en vivo; devuelve el historial."""
+    st.caption("Convergencia (en vivo)")
+    chart = st.line_chart(pd.DataFrame(columns=['Mejor', 'Media']))
+    history = []
+    for snap in solver.iter_run(summary_only=True):
+        history.append(snap)
+        chart.add_rows(convergence_row(snap))
+    return history
+
+def show_convergence(history):
+    """Gráfico de convergencia de un resultado guardado en la caché."""
+    st.caption("Convergencia")
+    st.line_chart(pd.concat([convergence_row(snap) for snap in history]) if history else
+                  pd.DataFrame(columns=['Mejor', 'Media']))
+
 # Cargar la instancia del problema basado en la selección
 try:
-    customer_ids_to_visit = scenarios[selected_scenario_name]
-    problem_instance = setup_problem_instance(all_customers_df, customer_ids_to_visit)
+    if selected_scenario_name == SYNTHETIC_OPTION:
+        problem_instance = synthetic_instance(synthetic_n, synthetic_kind, synthetic_seed)
+        instance_key = f"synthetic-{synthetic_n}-{synthetic_kind}-{synthetic_seed}"
+    elif selected_scenario_name == VRP_FILE_OPTION:
+        if vrp_file is None:
+            st.info("Sube un archivo .vrp en la barra lateral para continuar.")
+            st.stop()
+        vrp_bytes = vrp_file.getvalue()
+        problem_instance = vrp_instance(vrp_bytes)
+        instance_key = f"vrp-{hashlib.sha256(vrp_bytes).hexdigest()[:16]}"
+        selected_scenario_name = problem_instance['name'] or vrp_file.name
+    else:
+        problem_instance = scenario_instance(selected_scenario_name)
+        instance_key = selected_scenario_name
     st.subheader(f"Instancia: {selected_scenario_name} ({problem_instance['num_nodes']-1} paradas)")
 except Exception as e:
     st.error(f"Error preparando la instancia del problema: {e}")
     st.stop()
 
 # --- LÓGICA PARA EJECUCIÓN VISUAL ÚNICA ---
+# Tras pulsar el botón, los resultados se siguen mostrando en las siguientes
+# ejecuciones del script mientras estén en la caché (misma configuración).
 if start_single_run:
+    st.session_state['single_run_active'] = True
+
+if st.session_state.get('single_run_active'):
     st.header("Resultados de la Ejecución Visual Única")
     
     # Preparar columnas para resultados
@@ -93,102 +229,158 @@ if start_single_run:
         'GA': alg_columns[1],
         'H-ACO': alg_columns[2]
     }
+    ga_params = {'pop_size': ga_pop_size, 'generations': ga_generations, 'cx_rate': 0.8, 'mut_rate': 0.1,
+                 **stopping_params}
+    haco_params = {'n_ants': n_ants, 'n_iterations': n_iterations, 'alpha': alpha, 'beta': beta, 'rho': rho,
+                   'q': 100, **warm_start_params, **stopping_params} # Constante Q, se puede sintonizar
+    
+    def pending(key):
+        """True si no hay resultado guardado y no se ha pedido ejecutar (configuración cambiada)."""
+        if cached_result(key) is None and not start_single_run:
+            st.info("La configuración cambió: pulsa INICIAR EJECUCIÓN VISUAL para ejecutar.")
+            return True
+        return False
 
     # --- Ejecutar CWS ---
     if run_cws_flag:
         with col_map['CWS']:
             st.markdown("#### 1. Clarke & Wright (CWS)")
-            with st.spinner("Ejecutando CWS..."):
-                start_time = time.time()
-                cws_solution, cws_cost = run_cws(problem_instance)
-                exec_time = time.time() - start_time
-            
-            st.metric("Costo Total (Distancia Km)", f"{cws_cost:,.2f} Km")
-            st.caption(f"Tiempo: {exec_time:.2f} seg. | Rutas: {len(cws_solution)}")
-            
-            fig = plot_routes(cws_solution, problem_instance, "Rutas CWS")
-            st.plotly_chart(fig, use_container_width=True)
+            key = result_key('CWS', {}, None)
+            if not pending(key):
+                result = cached_result(key)
+                if result is None:
+                    with st.spinner("Ejecutando CWS..."):
+                        start_time = time.time()
+                        cws_solution, cws_cost = run_cws(problem_instance)
+                        result = {'solution': cws_solution, 'cost': cws_cost, 'time': time.time() - start_time}
+                    store_result(key, result)
+                
+                st.metric("Costo Total (Distancia Km)", f"{result['cost']:,.2f} Km")
+                st.caption(f"Tiempo: {result['time']:.2f} seg. | Rutas: {len(result['solution'])}")
+                
+                fig = plot_routes(result['solution'], problem_instance, "Rutas CWS", max_points=MAP_MAX_POINTS)
+                st.plotly_chart(fig, use_container_width=True)
 
     # --- Ejecutar GA ---
     if run_ga_flag:
         with col_map['GA']:
             st.markdown("#### 2. Algoritmo Genético (GA)")
-            with st.spinner(f"Ejecutando GA ({ga_generations} gen)..."):
-                start_time = time.time()
-                ga = GeneticAlgorithm(
-                    problem=problem_instance,
-                    pop_size=ga_pop_size,
-                    generations=ga_generations,
-                    cx_rate=0.8,
-                    mut_rate=0.1
-                )
-                ga_solution, ga_cost = ga.run()
-                exec_time = time.time() - start_time
-            
-            st.metric("Costo Total (Distancia Km)", f"{ga_cost:,.2f} Km")
-            st.caption(f"Tiempo: {exec_time:.2f} seg. | Rutas: {len(ga_solution)}")
-            
-            fig = plot_routes(ga_solution, problem_instance, "Rutas GA")
-            st.plotly_chart(fig, use_container_width=True)
+            key = result_key('GA', {**ga_params, 'profile': show_profile}, visual_seed)
+            if not pending(key):
+                result = cached_result(key)
+                if result is None:
+                    with st.spinner(f"Ejecutando GA ({ga_generations} gen)..."):
+                        start_time = time.time()
+                        ga = GeneticAlgorithm(
+                            problem=problem_instance,
+                            seed=visual_seed,
+                            profiler=Profiler(enabled=show_profile),
+                            **ga_params
+                        )
+                        history = run_with_live_chart(ga)
+                        result = {'solution': ga.best_solution, 'cost': ga.best_cost, 'time': time.time() - start_time,
+                                  'run_stats': ga.run_stats, 'history': history}
+                    store_result(key, result)
+                else:
+                    show_convergence(result['history'])
+                
+                run_stats = result['run_stats']
+                st.metric("Costo Total (Distancia Km)", f"{result['cost']:,.2f} Km")
+                st.caption(f"Tiempo: {result['time']:.2f} seg. | Rutas: {len(result['solution'])}")
+                st.caption(f"Mejor en: {run_stats['time_to_best']:.2f} seg. | "
+                           f"Generaciones: {run_stats['iterations']} | Parada: {run_stats['stop_reason']}")
+                show_profile_breakdown(run_stats)
+                
+                fig = plot_routes(result['solution'], problem_instance, "Rutas GA", max_points=MAP_MAX_POINTS)
+                st.plotly_chart(fig, use_container_width=True)
 
     # --- Ejecutar H-ACO ---
     if run_haco_flag:
         with col_map['H-ACO']:
             st.markdown("#### 3. H-ACO (Propuesto)")
-            with st.spinner(f"Ejecutando H-ACO ({n_iterations} iter)..."):
-                start_time = time.time()
-                h_aco = HybridACO(
-                    problem=problem_instance,
-                    n_ants=n_ants,
-                    n_iterations=n_iterations,
-                    alpha=alpha,
-                    beta=beta,
-                    rho=rho,
-                    q=100 # Constante Q, se puede sintonizar
-                )
-                haco_solution, haco_cost = h_aco.run()
-                exec_time = time.time() - start_time
-            
-            st.metric("Costo Total (Distancia Km)", f"{haco_cost:,.2f} Km")
-            st.caption(f"Tiempo: {exec_time:.2f} seg. | Rutas: {len(haco_solution)}")
-            
-            fig = plot_routes(haco_solution, problem_instance, "Rutas H-ACO")
-            st.plotly_chart(fig, use_container_width=True)
+            key = result_key('H-ACO', {**haco_params, 'profile': show_profile}, visual_seed)
+            if not pending(key):
+                result = cached_result(key)
+                if result is None:
+                    with st.spinner(f"Ejecutando H-ACO ({n_iterations} iter)..."):
+                        start_time = time.time()
+                        h_aco = HybridACO(
+                            problem=problem_instance,
+                            seed=visual_seed,
+                            profiler=Profiler(enabled=show_profile),
+                            **haco_params
+                        )
+                        history = run_with_live_chart(h_aco)
+                        result = {'solution': h_aco.best_solution, 'cost': h_aco.best_cost,
+                                  'time': time.time() - start_time, 'run_stats': h_aco.run_stats,
+                                  'history': history, 'entropy': h_aco._pheromone_entropy()}
+                    store_result(key, result)
+                else:
+                    show_convergence(result['history'])
+                
+                run_stats = result['run_stats']
+                st.metric("Costo Total (Distancia Km)", f"{result['cost']:,.2f} Km")
+                st.caption(f"Tiempo: {result['time']:.2f} seg. | Rutas: {len(result['solution'])}")
+                st.caption(f"Mejor en: {run_stats['time_to_best']:.2f} seg. | "
+                           f"Iteraciones: {run_stats['iterations']} | Parada: {run_stats['stop_reason']}")
+                st.caption(f"Entropía final de la feromona: {result['entropy']:.3f} (1 = uniforme)")
+                show_profile_breakdown(run_stats)
+                
+                fig = plot_routes(result['solution'], problem_instance, "Rutas H-ACO", max_points=MAP_MAX_POINTS)
+                st.plotly_chart(fig, use_container_width=True)
 
 
 # --- LÓGICA PARA EXPERIMENTO ESTADÍSTICO ---
-if run_statistical_experiment:
+# Cada corrida se guarda en EXPERIMENT_DB al terminar: al relanzar el experimento
+# solo se ejecutan las corridas que faltan, y las estadísticas se calculan
+# siempre desde el almacén (se acumulan entre sesiones).
+experiment_algorithms = ['CWS', 'GA', 'H-ACO']
+experiment_params = {
+    'GA': {'pop_size': ga_pop_size, 'generations': ga_generations, **stopping_params},
+    'H-ACO': {'n_ants': n_ants, 'n_iterations': n_iterations, 'alpha': alpha, 'beta': beta, 'rho': rho,
+              **warm_start_params, **stopping_params}
+}
+experiment_store = get_experiment_store()
+total_results = len(experiment_algorithms) * n_runs
+stored_results = experiment_store.results(instance_key, experiment_algorithms, experiment_params, base_seed, n_runs)
+
+if run_statistical_experiment or stored_results:
     st.header(f"Resultados del Experimento Robusto ({n_runs} corridas)")
     st.write(f"Comparando H-ACO, GA y CWS para la instancia: **{selected_scenario_name}**")
     
-    results_list = []
-    progress_bar = st.progress(0, text="Iniciando experimento...")
-    
-    # --- 1. CWS (Solo 1 corrida, es determinista) ---
-    cws_solution, cws_cost = run_cws(problem_instance)
-    for i in range(n_runs):
-        results_list.append({'Algorithm': 'CWS', 'Run': i+1, 'Cost': cws_cost})
-
-    # --- 2. GA y H-ACO (N corridas) ---
-    for i in range(n_runs):
-        text = f"Ejecutando corrida {i+1}/{n_runs}..."
-        progress_bar.progress((i+1)/n_runs, text=text)
-        
-        # Ejecutar GA
-        ga = GeneticAlgorithm(problem_instance, ga_pop_size, ga_generations)
-        _, ga_cost = ga.run()
-        results_list.append({'Algorithm': 'GA', 'Run': i+1, 'Cost': ga_cost})
+    if run_statistical_experiment and len(stored_results) < total_results:
+        results_list = [{'Algorithm': r['Algorithm'], 'Run': r['Run'], 'Cost': r['Cost']} for r in stored_results]
+        progress_bar = st.progress(len(results_list) / total_results, text="Iniciando experimento...")
+        live_plot = st.empty()
         
-        # Ejecutar H-ACO
-        h_aco = HybridACO(problem_instance, n_ants, n_iterations, alpha, beta, rho)
-        _, haco_cost = h_aco.run()
-        results_list.append({'Algorithm': 'H-ACO', 'Run': i+1, 'Cost': haco_cost})
+        # --- CWS (1 corrida, es determinista), GA y H-ACO (N corridas) en paralelo ---
+        for result in iter_stored_experiment(experiment_store, instance_key, problem_instance,
+                                             experiment_algorithms, n_runs, experiment_params,
+                                             base_seed, n_workers):
+            results_list.append({'Algorithm': result['Algorithm'], 'Run': result['Run'], 'Cost': result['Cost']})
+            
+            done = len(results_list)
+            progress_bar.progress(done / total_results, text=f"Corridas completadas: {done}/{total_results}")
+            live_plot.plotly_chart(
+                px.box(pd.DataFrame(results_list), x='Algorithm', y='Cost', color='Algorithm', points="all"),
+                use_container_width=True
+            )
 
-    progress_bar.empty()
-    st.success("Experimento completado.")
+        progress_bar.empty()
+        live_plot.empty()
+        st.success("Experimento completado.")
+        stored_results = experiment_store.results(instance_key, experiment_algorithms, experiment_params,
+                                                  base_seed, n_runs)
+    elif len(stored_results) < total_results:
+        st.info(f"Corridas guardadas: {len(stored_results)}/{total_results}. "
+                "Pulsa INICIAR EXPERIMENTO ESTADÍSTICO para completar solo las que faltan.")
+    else:
+        st.caption(f"Resultados leídos del almacén de experimentos ({EXPERIMENT_DB}).")
+    
+    results_list = [{'Algorithm': r['Algorithm'], 'Run': r['Run'], 'Cost': r['Cost']} for r in stored_results]
     
-    # Crear DataFrame
-    df_results = pd.DataFrame(results_list)
+    # Crear DataFrame (ordenado por corrida para el test pareado)
+    df_results = pd.DataFrame(results_list).sort_values(by=['Algorithm', 'Run']).reset_index(drop=True)
     
     # --- Mostrar Resultados ---
     col_stats, col_plot = st.columns(2)
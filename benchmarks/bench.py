@@ -0,0 +1,209 @@
+"""
+Suite de benchmarks (sin interfaz) para CWS, GA y H-ACO.
+
+Mide tiempos, throughput (hormigas/s, generaciones/s), memoria pico y calidad de
+solución en los escenarios S-1..S-10 y en instancias sintéticas escaladas, y los
+compara con una línea base guardada para detectar regresiones antes de desplegar.
+
+Uso:
+    python -m benchmarks.bench                          # todo, compara con la línea base
+    python -m benchmarks.bench --sizes 100 500          # solo algunas instancias sintéticas
+    python -m benchmarks.bench --save-baseline          # guarda los resultados como línea base
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from src.data_loader import load_customer_data, get_simulation_scenarios, setup_problem_instance, \
+    get_master_instance, generate_instance
+from src.algorithms.cws import run_cws
+from src.algorithms.ga import GeneticAlgorithm, VectorizedGeneticAlgorithm
+from src.algorithms.h_aco import HybridACO
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline.json')
+SYNTHETIC_SIZES = (100, 500, 1000, 5000)
+SEED = 12345
+
+# Parámetros de los algoritmos en el benchmark (pequeños: miden coste por iteración)
+HACO_PARAMS = {'n_ants': 10, 'n_iterations': 3, 'alpha': 1.0, 'beta': 5.0, 'rho': 0.1}
+GA_PARAMS = {'pop_size': 40, 'generations': 20}
+HOT_REPEATS = 5
+
+# Métricas donde "más alto" es mejor; en el resto, más bajo es mejor
+HIGHER_IS_BETTER = {'ants_per_s', 'generations_per_s', 'calls_per_s'}
+
+def _timed(func, repeats=1):
+    """Ejecuta func 'repeats' veces; devuelve (último resultado, mediana del tiempo en seg)."""
+    times, result = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+def _peak_memory_mb(func):
+    """Memoria pico (MB) asignada por func, medida con tracemalloc en una ejecución aparte."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+def bench_problem(problem, measure_memory=True):
+    """Benchmarks de algoritmos completos y funciones internas sobre una instancia."""
+    results = {}
+    n_ants, n_iterations = HACO_PARAMS['n_ants'], HACO_PARAMS['n_iterations']
+
+    def _cws():
+        return run_cws(problem)
+    (_, cost), secs = _timed(_cws)
+    results['run_cws'] = {'time_s': secs, 'cost': float(cost)}
+
+    for name, ga_class in (('GeneticAlgorithm', GeneticAlgorithm), ('VectorizedGeneticAlgorithm', VectorizedGeneticAlgorithm)):
+        def _ga(ga_class=ga_class):
+            return ga_class(problem, seed=SEED, **GA_PARAMS).run()
+        (_, cost), secs = _timed(_ga)
+        results[name] = {'time_s': secs, 'generations_per_s': GA_PARAMS['generations'] / secs, 'cost': float(cost)}
+        if measure_memory:
+            results[name]['peak_mb'] = _peak_memory_mb(_ga)
+
+    def _haco():
+        return HybridACO(problem, seed=SEED, **HACO_PARAMS).run()
+    (_, cost), secs = _timed(_haco)
+    results['HybridACO'] = {'time_s': secs, 'ants_per_s': n_ants * n_iterations / secs, 'cost': float(cost)}
+    if measure_memory:
+        results['HybridACO']['peak_mb'] = _peak_memory_mb(_haco)
+        results['run_cws']['peak_mb'] = _peak_memory_mb(_cws)
+
+    # --- Funciones internas (hot paths) ---
+    colony = HybridACO(problem, seed=SEED, **HACO_PARAMS)
+    _, secs = _timed(lambda: HybridACO(problem, seed=SEED, **HACO_PARAMS))
+    results['HybridACO.__init__'] = {'time_s': secs}
+
+    _, secs = _timed(colony._construct_solution, HOT_REPEATS)
+    results['HybridACO._construct_solution'] = {'time_s': secs, 'calls_per_s': 1 / secs}
+
+    _, secs = _timed(lambda: colony._construct_solutions(n_ants), HOT_REPEATS)
+    results['HybridACO._construct_solutions'] = {'time_s': secs, 'ants_per_s': n_ants / secs}
+
+    ant_solution = colony._construct_solution()
+    _, secs = _timed(lambda: colony._apply_vns(ant_solution), HOT_REPEATS)
+    results['HybridACO._apply_vns'] = {'time_s': secs, 'calls_per_s': 1 / secs}
+
+    ga = GeneticAlgorithm(problem, seed=SEED, **GA_PARAMS)
+    chromosome = ga._create_individual()
+    _, secs = _timed(lambda: ga._decode_chromosome(chromosome), HOT_REPEATS)
+    results['GeneticAlgorithm._decode_chromosome'] = {'time_s': secs, 'calls_per_s': 1 / secs}
+
+    vga = VectorizedGeneticAlgorithm(problem, seed=SEED, **GA_PARAMS)
+    population = vga._create_population()
+    _, secs = _timed(lambda: vga._evaluate(population), HOT_REPEATS)
+    results['VectorizedGeneticAlgorithm._evaluate'] = {'time_s': secs, 'calls_per_s': 1 / secs}
+
+    return results
+
+def run_suite(sizes=SYNTHETIC_SIZES, scenarios=True, measure_memory=True, log=print):
+    """Ejecuta la suite completa. Devuelve {instancia: {objetivo: {métrica: valor}}}."""
+    suite = {}
+
+    if scenarios:
+        all_customers_df = load_customer_data()
+        get_master_instance(all_customers_df) # La matriz maestra se construye una vez
+        for name, customer_ids in get_simulation_scenarios().items():
+            log(f"[bench] {name} ({len(customer_ids)} clientes)")
+            problem, secs = _timed(lambda: setup_problem_instance(all_customers_df, customer_ids), HOT_REPEATS)
+            suite[name] = {'setup_problem_instance': {'time_s': secs}}
+            suite[name].update(bench_problem(problem, measure_memory))
+
+    for n in sizes:
+        name = f"synthetic-{n}"
+        log(f"[bench] {name}")
+        problem, secs = _timed(lambda: generate_instance(n, 'mixed', seed=SEED))
+        suite[name] = {'make_instance': {'time_s': secs}}
+        suite[name].update(bench_problem(problem, measure_memory))
+
+    return suite
+
+def compare_with_baseline(results, baseline, time_tolerance=0.25, cost_tolerance=0.05):
+    """
+    Compara resultados con la línea base. Devuelve la lista de regresiones como
+    (instancia, objetivo, métrica, valor base, valor actual).
+    Tiempos, throughput y memoria usan 'time_tolerance'; el costo usa 'cost_tolerance'.
+    """
+    regressions = []
+    for instance, targets in results.items():
+        for target, metrics in targets.items():
+            base_metrics = baseline.get(instance, {}).get(target, {})
+            for metric, value in metrics.items():
+                base = base_metrics.get(metric)
+                if base is None or base == 0:
+                    continue
+                tolerance = cost_tolerance if metric == 'cost' else time_tolerance
+                if metric in HIGHER_IS_BETTER:
+                    worse = value < base * (1 - tolerance)
+                else:
+                    worse = value > base * (1 + tolerance)
+                if worse:
+                    regressions.append((instance, target, metric, base, value))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de CWS, GA y H-ACO.")
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(SYNTHETIC_SIZES),
+                        help="Tamaños de las instancias sintéticas (clientes).")
+    parser.add_argument('--no-scenarios', action='store_true', help="No ejecutar S-1..S-10.")
+    parser.add_argument('--no-memory', action='store_true', help="No medir memoria pico (más rápido).")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help="Archivo JSON de línea base.")
+    parser.add_argument('--save-baseline', action='store_true', help="Guardar los resultados como línea base.")
+    parser.add_argument('--output', type=Path, help="Guardar los resultados en este JSON.")
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--cost-tolerance', type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, not args.no_scenarios, not args.no_memory,
+                        log=lambda msg: print(msg, file=sys.stderr))
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform()
+        },
+        'results': results
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Línea base guardada en {args.baseline}")
+        return 0
+
+    for instance, targets in results.items():
+        for target, metrics in targets.items():
+            values = ", ".join(f"{k}={v:,.4g}" for k, v in metrics.items())
+            print(f"{instance:<16} {target:<40} {values}")
+
+    if not args.baseline.exists():
+        print(f"Sin línea base ({args.baseline}); usa --save-baseline para crearla.")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())['results']
+    regressions = compare_with_baseline(results, baseline, args.time_tolerance, args.cost_tolerance)
+    for instance, target, metric, base, value in regressions:
+        print(f"REGRESIÓN {instance} / {target} / {metric}: {base:,.4g} -> {value:,.4g}")
+    if regressions:
+        return 1
+    print("Sin regresiones respecto a la línea base.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import time
+
+# Motivos de parada reportados por los algoritmos
+STOP_MAX_ITERATIONS = 'max_iterations'
+STOP_TIME_LIMIT = 'time_limit'
+STOP_STAGNATION = 'stagnation'
+
+class SearchBudget:
+    """
+    Criterios de parada comunes a los algoritmos iterativos (H-ACO, GA).
+    Se consulta entre iteraciones: límite de iteraciones, presupuesto de tiempo
+    (segundos de reloj) y estancamiento (iteraciones seguidas sin mejorar el mejor costo).
+    También registra el tiempo hasta encontrar la mejor solución (time-to-best).
+    """
+
+    def __init__(self, max_iterations, time_limit=None, stagnation_limit=None):
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit
+        self.stagnation_limit = stagnation_limit
+        self.start()
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.iterations = 0
+        self.stagnant_iterations = 0
+        self.best_cost = float('inf')
+        self.time_to_best = None
+        self.stop_reason = None
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def record(self, best_cost):
+        """Registra el mejor costo tras una iteración (o tras la inicialización, sin contarla)."""
+        if best_cost < self.best_cost:
+            self.best_cost = best_cost
+            self.time_to_best = self.elapsed()
+            self.stagnant_iterations = 0
+            return True
+        self.stagnant_iterations += 1
+        return False
+
+    def next_iteration(self):
+        """True si se puede ejecutar otra iteración; si no, fija stop_reason."""
+        if self.iterations >= self.max_iterations:
+            self.stop_reason = STOP_MAX_ITERATIONS
+        elif self.time_limit is not None and self.elapsed() >= self.time_limit:
+            self.stop_reason = STOP_TIME_LIMIT
+        elif self.stagnation_limit is not None and self.stagnant_iterations >= self.stagnation_limit:
+            self.stop_reason = STOP_STAGNATION
+        else:
+            self.iterations += 1
+            return True
+        return False
+
+    def summary(self):
+        return {
+            'iterations': self.iterations,
+            'elapsed': self.elapsed(),
+            'time_to_best': self.time_to_best,
+            'stop_reason': self.stop_reason
+        }
+
+def convergence_snapshot(budget, best_cost, costs, **extra):
+    """
+    Resumen de una iteración para los iter_run() de los algoritmos: iteración,
+    mejor costo global, costo medio de la iteración y tiempo transcurrido.
+    """
+    return {
+        'iteration': budget.iterations,
+        'best_cost': float(best_cost),
+        'mean_cost': float(sum(costs) / len(costs)),
+        'elapsed': budget.elapsed(),
+        **extra
+    }
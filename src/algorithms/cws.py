@@ -1,89 +1,185 @@
-import time
-from src.utils import calculate_solution_cost
+import numpy as np
+from src.local_search import post_optimize
+from src.utils import calculate_solution_cost, get_candidate_lists
 
-def run_cws(problem):
+def run_cws(problem, n_candidates=None, local_search=None):
     """
     Implementación de la heurística CWS (Benchmark 1).
+    Los ahorros se calculan y ordenan con NumPy; las rutas se representan como
+    listas doblemente enlazadas sobre arrays indexados por nodo, de modo que cada
+    fusión (y cada comprobación de extremos / misma ruta) cuesta O(1).
+    Con 'n_candidates' solo se consideran los ahorros entre vecinos cercanos
+    (listas de candidatos), útil en instancias con miles de clientes.
+    Con distancias asimétricas (problem['symmetric'] = False) se usa la variante
+    dirigida (ver _run_cws_asymmetric).
+    Con 'local_search' (vecindarios de src/local_search.py, o True para todos) el
+    resultado se pule con la VNS.
     """
-    start_time = time.time()
-    
+    if problem.get('symmetric', True):
+        solution, cost = _run_cws_symmetric(problem, n_candidates)
+    else:
+        solution, cost = _run_cws_asymmetric(problem, n_candidates)
+    if local_search:
+        solution, cost = post_optimize(problem, solution, local_search, n_candidates)
+    return solution, cost
+
+def _run_cws_symmetric(problem, n_candidates=None):
+    """CWS clásico: ahorros entre pares i < j y fusiones por cualquiera de los extremos."""
     dist_matrix = problem['dist_matrix']
     demands = problem['demands']
     capacity = problem['capacity']
     customer_nodes = problem['customer_nodes'] # Índices 1 a N
-    
-    # 1. Calcular ahorros (savings)
-    savings = []
-    for i in customer_nodes:
-        for j in customer_nodes:
-            if i < j:
-                s_ij = dist_matrix[0, i] + dist_matrix[0, j] - dist_matrix[i, j]
-                if s_ij > 0:
-                    savings.append((s_ij, i, j))
-                
-    # 2. Ordenar ahorros de mayor a menor
-    savings.sort(key=lambda x: x[0], reverse=True)
-    
+    n_nodes = problem['num_nodes']
+    customers = np.asarray(customer_nodes, dtype=np.intp)
+
+    # 1. Calcular ahorros (savings) para los pares i < j
+    if n_candidates is None:
+        i_idx, j_idx = np.triu_indices(len(customers), k=1)
+        i_nodes, j_nodes = customers[i_idx], customers[j_idx]
+    else:
+        a, b = _candidate_pairs(problem, customers, n_candidates)
+        pair_keys = np.unique(np.minimum(a, b) * n_nodes + np.maximum(a, b))
+        i_nodes, j_nodes = pair_keys // n_nodes, pair_keys % n_nodes
+
+    savings = dist_matrix[0, i_nodes] + dist_matrix[0, j_nodes] - dist_matrix[i_nodes, j_nodes]
+    positive = savings > 0
+    i_nodes, j_nodes, savings = i_nodes[positive], j_nodes[positive], savings[positive]
+
+    # 2. Ordenar ahorros de mayor a menor (estable: mismo orden que el recorrido i < j)
+    order = np.argsort(-savings, kind='stable')
+
     # 3. Inicializar rutas (una por cliente)
-    routes = {i: [i] for i in customer_nodes}
-    route_demands = {i: demands[i] for i in customer_nodes}
-    
+    # link_a / link_b: vecinos de cada nodo en su ruta (0 = depósito / libre).
+    # Un nodo es extremo de su ruta mientras link_b esté libre.
+    # other_end: para cada extremo, el extremo opuesto de su ruta.
+    # route_load: carga de la ruta, válida en sus dos extremos.
+    link_a = [0] * n_nodes
+    link_b = [0] * n_nodes
+    other_end = list(range(n_nodes))
+    route_load = np.asarray(demands, dtype=float).tolist()
+
     # 4. Fusionar rutas
-    for s_ij, i, j in savings:
-        
-        # Encontrar a qué rutas pertenecen i y j
-        route_i_key, route_j_key = None, None
-        is_i_edge, is_j_edge = False, False # True si está en un extremo de la ruta
-        
-        for key, route in routes.items():
-            if not route: continue
-            if route[0] == i:
-                route_i_key = key
-                is_i_edge = True
-            elif route[-1] == i:
-                route_i_key = key
-                is_i_edge = True
-            
-            if route[0] == j:
-                route_j_key = key
-                is_j_edge = True
-            elif route[-1] == j:
-                route_j_key = key
-                is_j_edge = True
+    for i, j in zip(i_nodes[order].tolist(), j_nodes[order].tolist()):
 
         # Solo fusionar si:
-        # 1. i y j están en rutas DIFERENTES
-        # 2. i y j están en los extremos de sus rutas
-        if route_i_key is not None and route_j_key is not None and \
-           route_i_key != route_j_key and is_i_edge and is_j_edge:
-            
-            route_i = routes[route_i_key]
-            route_j = routes[route_j_key]
-            
-            # Verificar capacidad
-            if route_demands[route_i_key] + route_demands[route_j_key] > capacity:
-                continue
-            
-            new_route = None
-            if route_i[-1] == i and route_j[0] == j:
-                new_route = route_i + route_j
-            elif route_j[-1] == j and route_i[0] == i:
-                new_route = route_j + route_i
-            elif route_i[0] == i and route_j[0] == j:
-                new_route = list(reversed(route_i)) + route_j
-            elif route_i[-1] == i and route_j[-1] == j:
-                 new_route = route_i + list(reversed(route_j))
-            
-            if new_route:
-                new_demand = route_demands[route_i_key] + route_demands[route_j_key]
-                routes[route_i_key] = new_route
-                route_demands[route_i_key] = new_demand
-                
-                routes[route_j_key] = [] # Marcar ruta j como vacía
-                route_demands[route_j_key] = 0
-
-    # 5. Formatear solución final
-    final_solution = [route for route in routes.values() if route]
+        # 1. i y j están en los extremos de sus rutas
+        # 2. i y j están en rutas DIFERENTES
+        if link_b[i] or link_b[j] or other_end[i] == j:
+            continue
+
+        # Verificar capacidad
+        new_load = route_load[i] + route_load[j]
+        if new_load > capacity:
+            continue
+
+        # Enlazar i <-> j (sin copiar rutas)
+        if link_a[i]:
+            link_b[i] = j
+        else:
+            link_a[i] = j
+        if link_a[j]:
+            link_b[j] = i
+        else:
+            link_a[j] = i
+
+        end_i, end_j = other_end[i], other_end[j]
+        other_end[end_i] = end_j
+        other_end[end_j] = end_i
+        route_load[end_i] = new_load
+        route_load[end_j] = new_load
+
+    # 5. Formatear solución final (recorrer cada ruta desde uno de sus extremos)
+    final_solution = []
+    visited = [False] * n_nodes
+    for start in customer_nodes:
+        if visited[start] or link_b[start]:
+            continue
+        route = []
+        prev, node = 0, start
+        while node:
+            route.append(node)
+            visited[node] = True
+            prev, node = node, (link_a[node] if link_a[node] != prev else link_b[node])
+        final_solution.append(route)
+
     best_cost = calculate_solution_cost(final_solution, dist_matrix)
-    
+
+    return final_solution, best_cost
+
+def _candidate_pairs(problem, customers, n_candidates):
+    """Pares (cliente, candidato) de las listas de candidatos, solo entre clientes."""
+    candidates = get_candidate_lists(problem, n_candidates)[customers]
+    is_customer = np.zeros(problem['num_nodes'], dtype=bool)
+    is_customer[customers] = True
+    a = np.repeat(customers, candidates.shape[1])
+    b = candidates.ravel()
+    keep = is_customer[b]
+    return a[keep], b[keep]
+
+def _run_cws_asymmetric(problem, n_candidates=None):
+    """
+    CWS dirigido para distancias asimétricas (p. ej. por carretera). Cada par ordenado
+    (i, j) tiene su ahorro d(i,0) + d(0,j) - d(i,j), y solo se fusiona si i es el
+    ÚLTIMO cliente de su ruta y j el PRIMERO de la suya (la ruta de i sigue con la de j).
+    """
+    dist_matrix = problem['dist_matrix']
+    demands = problem['demands']
+    capacity = problem['capacity']
+    customer_nodes = problem['customer_nodes']
+    n_nodes = problem['num_nodes']
+    customers = np.asarray(customer_nodes, dtype=np.intp)
+
+    # 1. Ahorros de los pares ordenados i != j
+    if n_candidates is None:
+        i_nodes = np.repeat(customers, len(customers))
+        j_nodes = np.tile(customers, len(customers))
+        distinct = i_nodes != j_nodes
+        i_nodes, j_nodes = i_nodes[distinct], j_nodes[distinct]
+    else:
+        a, b = _candidate_pairs(problem, customers, n_candidates)
+        pair_keys = np.unique(np.concatenate((a * n_nodes + b, b * n_nodes + a)))
+        i_nodes, j_nodes = pair_keys // n_nodes, pair_keys % n_nodes
+
+    savings = dist_matrix[i_nodes, 0] + dist_matrix[0, j_nodes] - dist_matrix[i_nodes, j_nodes]
+    positive = savings > 0
+    i_nodes, j_nodes, savings = i_nodes[positive], j_nodes[positive], savings[positive]
+    order = np.argsort(-savings, kind='stable')
+
+    # 2. Rutas como listas enlazadas dirigidas (0 = depósito / sin enlace)
+    # other_end: del primer cliente de una ruta, el último, y viceversa
+    next_node = [0] * n_nodes
+    prev_node = [0] * n_nodes
+    other_end = list(range(n_nodes))
+    route_load = np.asarray(demands, dtype=float).tolist()
+
+    # 3. Fusionar rutas: ... -> i  +  j -> ...
+    for i, j in zip(i_nodes[order].tolist(), j_nodes[order].tolist()):
+        if next_node[i] or prev_node[j] or other_end[i] == j:
+            continue
+        new_load = route_load[i] + route_load[j]
+        if new_load > capacity:
+            continue
+
+        next_node[i] = j
+        prev_node[j] = i
+        first, last = other_end[i], other_end[j]
+        other_end[first] = last
+        other_end[last] = first
+        route_load[first] = new_load
+        route_load[last] = new_load
+
+    # 4. Formatear solución final (recorrer cada ruta desde su primer cliente)
+    final_solution = []
+    for start in customer_nodes:
+        if prev_node[start]:
+            continue
+        route = []
+        node = start
+        while node:
+            route.append(node)
+            node = next_node[node]
+        final_solution.append(route)
+
+    best_cost = calculate_solution_cost(final_solution, dist_matrix)
+
     return final_solution, best_cost
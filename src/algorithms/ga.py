@@ -1,16 +1,28 @@
 import random
 import numpy as np
-from src.utils import calculate_solution_cost
+from src.algorithms.budget import SearchBudget, convergence_snapshot
+from src.algorithms.profiling import Profiler
+from src.local_search import post_optimize
+from src.solution import Solution
 
 class GeneticAlgorithm:
     """Implementación de un GA estándar (Benchmark 2)."""
     
-    def __init__(self, problem, pop_size=100, generations=200, cx_rate=0.8, mut_rate=0.1):
+    def __init__(self, problem, pop_size=100, generations=200, cx_rate=0.8, mut_rate=0.1, seed=None,
+                 time_limit=None, stagnation_limit=None, profiler=None, local_search=None):
         self.problem = problem
         self.pop_size = pop_size
         self.generations = generations
         self.cx_rate = cx_rate
         self.mut_rate = mut_rate
+        self.rng = random.Random(seed)
+        self.time_limit = time_limit             # Presupuesto de tiempo (seg), None = sin límite
+        self.stagnation_limit = stagnation_limit # Generaciones sin mejora antes de parar
+        self.profiler = profiler or Profiler() # Tiempos por fase y contadores (apagado por defecto)
+        self.local_search = local_search # Vecindarios para pulir la mejor solución final (None = no)
+        self.run_stats = None # Generaciones, tiempo, time-to-best y motivo de parada
+        self.best_solution = None
+        self.best_cost = float('inf')
         
         self.dist_matrix = problem['dist_matrix']
         self.demands = problem['demands']
@@ -20,43 +32,30 @@ class GeneticAlgorithm:
     def _create_individual(self):
         """Crea un cromosoma (una permutación aleatoria de clientes)."""
         individual = self.customer_nodes.copy()
-        random.shuffle(individual)
+        self.rng.shuffle(individual)
         return individual
 
     def _decode_chromosome(self, chromosome):
         """Divide un cromosoma (lista) en rutas (lista de listas) basado en capacidad."""
-        solution = []
-        current_route = []
-        current_load = 0
-        
-        for node in chromosome:
-            demand = self.demands[node]
-            if current_load + demand <= self.capacity:
-                current_route.append(node)
-                current_load += demand
-            else:
-                if current_route: # Evitar rutas vacías si una parada ya supera la capacidad
-                    solution.append(current_route)
-                current_route = [node]
-                current_load = demand
-        
-        if current_route: # Añadir la última ruta
-            solution.append(current_route)
-            
-        return solution
+        self.profiler.count('decode')
+        return Solution.split_giant_tour(chromosome, self.problem).to_routes()
 
     def _calculate_fitness(self, chromosome):
-        """Calcula el fitness (costo total) de un cromosoma."""
-        solution = self._decode_chromosome(chromosome)
-        cost = calculate_solution_cost(solution, self.dist_matrix)
-        return cost, solution
+        """
+        Calcula el fitness (costo total) de un cromosoma. La división en rutas y el
+        costo se obtienen en una sola pasada; la solución se guarda como Solution
+        (compacta) y solo se convierte a lista de listas al exponer la mejor.
+        """
+        self.profiler.count('fitness')
+        solution = Solution.split_giant_tour(chromosome, self.problem)
+        return solution.total_cost(), solution
 
     def _selection(self, population):
         """Selección por torneo."""
         tournament_size = 3
         selected = []
         for _ in range(self.pop_size):
-            aspirants = random.sample(population, tournament_size)
+            aspirants = self.rng.sample(population, tournament_size)
             aspirants.sort(key=lambda x: x['fitness']) # Minimización
             selected.append(aspirants[0]['chromosome'])
         return selected
@@ -66,7 +65,7 @@ class GeneticAlgorithm:
         size = len(parent1)
         child1, child2 = [None]*size, [None]*size
         
-        start, end = sorted(random.sample(range(size), 2))
+        start, end = sorted(self.rng.sample(range(size), 2))
         
         child1[start:end+1] = parent1[start:end+1]
         child2[start:end+1] = parent2[start:end+1]
@@ -82,60 +81,306 @@ class GeneticAlgorithm:
                 p2_idx = (p2_idx + 1) % size
             child1[c1_idx] = parent2[p2_idx]
             c1_idx = (c1_idx + 1) % size
+            p2_idx = (p2_idx + 1) % size
 
             while parent1[p1_idx] in p1_items_in_child2:
                 p1_idx = (p1_idx + 1) % size
             child2[c2_idx] = parent1[p1_idx]
             c2_idx = (c2_idx + 1) % size
+            p1_idx = (p1_idx + 1) % size
             
         return child1, child2
 
     def _mutation(self, chromosome):
         """Mutación por intercambio (Swap)."""
-        if random.random() < self.mut_rate:
-            idx1, idx2 = random.sample(range(len(chromosome)), 2)
+        if self.rng.random() < self.mut_rate:
+            idx1, idx2 = self.rng.sample(range(len(chromosome)), 2)
             chromosome[idx1], chromosome[idx2] = chromosome[idx2], chromosome[idx1]
         return chromosome
 
     def run(self):
+        """
+        Evoluciona hasta agotar las generaciones, el presupuesto de tiempo o el límite
+        de estancamiento (se comprueba entre generaciones). Devuelve la mejor solución
+        encontrada; el detalle queda en self.run_stats.
+        """
+        for _ in self.iter_run(summary_only=True):
+            pass
+        return self.best_solution, self.best_cost
+
+    def iter_run(self, summary_only=False):
+        """
+        Igual que run(), pero como generador: entrega un resumen por generación
+        (generación, mejor costo, costo medio, tiempo). Con summary_only=False el
+        resumen incluye además la mejor solución y los costos de la población;
+        con summary_only=True solo contiene escalares (memoria constante).
+        """
+        budget = SearchBudget(self.generations, self.time_limit, self.stagnation_limit)
+        
         # 1. Inicializar población
         population = []
-        for _ in range(self.pop_size):
-            chromo = self._create_individual()
-            fitness, solution = self._calculate_fitness(chromo)
-            population.append({'chromosome': chromo, 'fitness': fitness, 'solution': solution})
+        with self.profiler.phase('initialization'):
+            for _ in range(self.pop_size):
+                chromo = self._create_individual()
+                fitness, solution = self._calculate_fitness(chromo)
+                population.append({'chromosome': chromo, 'fitness': fitness, 'solution': solution})
             
         best_ever = min(population, key=lambda x: x['fitness'])
         best_solution = best_ever['solution']
         best_cost = best_ever['fitness']
+        budget.record(best_cost)
 
         # 2. Evolucionar por N generaciones
-        for _ in range(self.generations):
-            # 1. Selección
-            selected_parents = self._selection(population)
-            
-            # 2. Cruce y Mutación
-            new_population_chromos = []
-            for i in range(0, self.pop_size, 2):
-                p1, p2 = selected_parents[i], selected_parents[i+1]
-                c1, c2 = (self._crossover(p1, p2)) if random.random() < self.cx_rate else (p1[:], p2[:])
-                new_population_chromos.extend([self._mutation(c1), self._mutation(c2)])
+        while budget.next_iteration():
+            with self.profiler.iteration():
+                # 1. Selección
+                with self.profiler.phase('selection'):
+                    selected_parents = self._selection(population)
                 
-            # 3. Evaluar nueva población y reemplazar
-            new_population = []
-            for chromo in new_population_chromos:
-                fitness, solution = self._calculate_fitness(chromo)
-                new_population.append({'chromosome': chromo, 'fitness': fitness, 'solution': solution})
+                # 2. Cruce y Mutación
+                new_population_chromos = []
+                with self.profiler.phase('crossover_mutation'):
+                    for i in range(0, self.pop_size, 2):
+                        p1, p2 = selected_parents[i], selected_parents[i+1]
+                        c1, c2 = (self._crossover(p1, p2)) if self.rng.random() < self.cx_rate else (p1[:], p2[:])
+                        new_population_chromos.extend([self._mutation(c1), self._mutation(c2)])
+                    
+                # 3. Evaluar nueva población y reemplazar
+                new_population = []
+                with self.profiler.phase('evaluation'):
+                    for chromo in new_population_chromos:
+                        fitness, solution = self._calculate_fitness(chromo)
+                        new_population.append({'chromosome': chromo, 'fitness': fitness, 'solution': solution})
+                
+                # Reemplazo (Elitismo: mantener la mejor solución)
+                new_population.sort(key=lambda x: x['fitness'])
+                
+                if new_population[0]['fitness'] < best_cost:
+                    best_cost = new_population[0]['fitness']
+                    best_solution = new_population[0]['solution']
+                budget.record(best_cost)
+                
+                # Reemplazar la peor de la nueva gen con la mejor de la anterior
+                new_population[-1] = {'chromosome': best_ever['chromosome'], 'fitness': best_cost, 'solution': best_solution}
+                population = new_population
             
-            # Reemplazo (Elitismo: mantener la mejor solución)
-            new_population.sort(key=lambda x: x['fitness'])
+            self.best_solution, self.best_cost = best_solution.to_routes(), best_cost
+            costs = [ind['fitness'] for ind in population]
+            if summary_only:
+                yield convergence_snapshot(budget, best_cost, costs)
+            else:
+                yield convergence_snapshot(budget, best_cost, costs, best_solution=self.best_solution, iteration_costs=costs)
+        
+        self.best_solution, self.best_cost = best_solution.to_routes(), best_cost
+        self.run_stats = budget.summary()
+        _post_optimize(self)
+        if self.profiler.enabled:
+            self.run_stats['profile'] = self.profiler.stats()
+
+
+def _post_optimize(ga):
+    """Pule la mejor solución final de un GA con la VNS (src/local_search.py), si se pidió."""
+    if not ga.local_search:
+        return
+    ga.run_stats['cost_before_local_search'] = float(ga.best_cost)
+    with ga.profiler.phase('local_search'):
+        ga.best_solution, ga.best_cost = post_optimize(ga.problem, ga.best_solution, ga.local_search,
+                                                       profiler=ga.profiler)
+
+
+class VectorizedGeneticAlgorithm:
+    """
+    Motor alternativo del GA con la población como array (pop_size, N) de enteros.
+    Decodificación (división por capacidad), fitness, selección por torneo, cruce OX
+    y mutación se aplican a toda la población a la vez con NumPy.
+    Mismos parámetros y operadores que GeneticAlgorithm, pero otro flujo de números
+    aleatorios: con la misma semilla los dos motores dan resultados distintos.
+    """
+    
+    def __init__(self, problem, pop_size=100, generations=200, cx_rate=0.8, mut_rate=0.1, seed=None,
+                 time_limit=None, stagnation_limit=None, profiler=None, local_search=None):
+        self.problem = problem
+        self.pop_size = pop_size
+        self.generations = generations
+        self.cx_rate = cx_rate
+        self.mut_rate = mut_rate
+        self.rng = np.random.default_rng(seed)
+        self.time_limit = time_limit
+        self.stagnation_limit = stagnation_limit
+        self.profiler = profiler or Profiler()
+        self.local_search = local_search
+        self.run_stats = None
+        self.best_solution = None
+        self.best_cost = float('inf')
+        
+        self.dist_matrix = problem['dist_matrix']
+        self.demands = np.asarray(problem['demands'], dtype=float)
+        self.capacity = problem['capacity']
+        self.customer_nodes = np.asarray(problem['customer_nodes'], dtype=np.intp)
+
+    def _create_population(self):
+        """Crea la población inicial (cada fila, una permutación aleatoria de clientes)."""
+        keys = self.rng.random((self.pop_size, len(self.customer_nodes)))
+        return self.customer_nodes[np.argsort(keys, axis=1)]
+
+    def _route_breaks(self, population):
+        """
+        División por capacidad de toda la población: breaks[p, t] es True si el
+        cliente en la posición t del individuo p abre una ruta nueva.
+        """
+        pop_demands = self.demands[population]
+        breaks = np.zeros(population.shape, dtype=bool)
+        load = np.zeros(len(population))
+        
+        for t in range(population.shape[1]):
+            d = pop_demands[:, t]
+            breaks[:, t] = load + d > self.capacity
+            load = np.where(breaks[:, t], d, load + d)
+        return breaks
+
+    def _evaluate(self, population):
+        """Fitness (costo total) de toda la población. Devuelve (costos, breaks)."""
+        self.profiler.count('fitness', len(population))
+        dist = self.dist_matrix
+        breaks = self._route_breaks(population)
+        
+        prev, nxt = population[:, :-1], population[:, 1:]
+        # Entre dos clientes: arco directo, o regreso al depósito si empieza ruta nueva
+        legs = np.where(breaks[:, 1:], dist[prev, 0] + dist[0, nxt], dist[prev, nxt])
+        costs = dist[0, population[:, 0]] + dist[population[:, -1], 0] + legs.sum(axis=1)
+        return costs, breaks
+
+    def _decode_chromosome(self, chromosome, breaks=None):
+        """Divide un cromosoma (array) en rutas (lista de listas) basado en capacidad."""
+        self.profiler.count('decode')
+        if breaks is None:
+            breaks = self._route_breaks(chromosome[None, :])[0]
+        starts = np.flatnonzero(breaks[1:]) + 1
+        return [route.tolist() for route in np.split(chromosome, starts)]
+
+    def _selection(self, fitness):
+        """Selección por torneo (tamaño 3, sin repetición dentro de cada torneo)."""
+        tournament_size = 3
+        n = len(fitness)
+        # j-ésimo aspirante: entero en [0, n - j) desplazado más allá de los ya elegidos
+        # (recorridos en orden creciente), así los 'tournament_size' son distintos
+        aspirants = np.empty((self.pop_size, tournament_size), dtype=np.intp)
+        for j in range(tournament_size):
+            draw = self.rng.integers(0, n - j, self.pop_size)
+            for chosen in np.sort(aspirants[:, :j], axis=1).T:
+                draw += draw >= chosen
+            aspirants[:, j] = draw
+        winners = np.take_along_axis(aspirants, fitness[aspirants].argmin(axis=1)[:, None], axis=1)
+        return winners[:, 0]
+
+    def _crossover(self, parents1, parents2):
+        """Order Crossover (OX1) aplicado a todas las parejas a la vez."""
+        n_pairs, size = parents1.shape
+        rows = np.arange(n_pairs)[:, None]
+        positions = np.arange(size)[None, :]
+        
+        cuts = np.sort(np.argpartition(self.rng.random((n_pairs, size)), 1, axis=1)[:, :2], axis=1)
+        start, end = cuts[:, :1], cuts[:, 1:]
+        in_segment = (positions >= start) & (positions <= end)
+        n_fill = size - (end - start + 1)
+        
+        # Posiciones a rellenar y orden de lectura del otro padre: desde end+1, circular
+        wrapped = (end + 1 + positions) % size
+        fill_mask = positions < n_fill
+        
+        def _ox(p_segment, p_other):
+            child = np.where(in_segment, p_segment, 0)
+            taken = np.zeros((n_pairs, self.demands.shape[0]), dtype=bool)
+            taken[rows, np.where(in_segment, p_segment, 0)] = True
+            taken[:, 0] = False
             
-            if new_population[0]['fitness'] < best_cost:
-                best_cost = new_population[0]['fitness']
-                best_solution = new_population[0]['solution']
+            donor = np.take_along_axis(p_other, wrapped, axis=1)
+            keep = ~taken[rows, donor]
+            order = np.argsort(~keep, axis=1, kind='stable') # Genes no usados, en orden
+            values = np.take_along_axis(donor, order, axis=1)
             
-            # Reemplazar la peor de la nueva gen con la mejor de la anterior
-            new_population[-1] = {'chromosome': best_ever['chromosome'], 'fitness': best_cost, 'solution': best_solution}
-            population = new_population
+            target = np.where(fill_mask, wrapped, 0)
+            child[np.broadcast_to(rows, target.shape)[fill_mask], target[fill_mask]] = values[fill_mask]
+            return child
+        
+        return _ox(parents1, parents2), _ox(parents2, parents1)
+
+    def _mutation(self, population):
+        """Mutación por intercambio (Swap), en sitio, sobre las filas sorteadas."""
+        mutants = np.flatnonzero(self.rng.random(len(population)) < self.mut_rate)
+        if mutants.size and population.shape[1] > 1:
+            idx = np.argpartition(self.rng.random((mutants.size, population.shape[1])), 1, axis=1)[:, :2]
+            a, b = idx[:, 0], idx[:, 1]
+            population[mutants, a], population[mutants, b] = population[mutants, b], population[mutants, a]
+        return population
+
+    def run(self):
+        for _ in self.iter_run(summary_only=True):
+            pass
+        return self.best_solution, self.best_cost
+
+    def iter_run(self, summary_only=False):
+        """Generador con un resumen por generación (ver GeneticAlgorithm.iter_run)."""
+        budget = SearchBudget(self.generations, self.time_limit, self.stagnation_limit)
+        
+        # 1. Inicializar población
+        with self.profiler.phase('initialization'):
+            population = self._create_population()
+            fitness, breaks = self._evaluate(population)
+        
+        best_idx = fitness.argmin()
+        best_chromosome = population[best_idx].copy()
+        best_breaks = breaks[best_idx].copy()
+        best_cost = fitness[best_idx]
+        budget.record(best_cost)
+        
+        n_pairs = self.pop_size // 2
+        
+        # 2. Evolucionar por N generaciones
+        while budget.next_iteration():
+            with self.profiler.iteration():
+                # 1. Selección
+                with self.profiler.phase('selection'):
+                    selected = population[self._selection(fitness)]
+                
+                # 2. Cruce y Mutación
+                with self.profiler.phase('crossover_mutation'):
+                    parents1, parents2 = selected[0:2 * n_pairs:2], selected[1:2 * n_pairs:2]
+                    if population.shape[1] > 1:
+                        do_cx = self.rng.random(n_pairs) < self.cx_rate
+                        children1, children2 = self._crossover(parents1[do_cx], parents2[do_cx])
+                        parents1[do_cx], parents2[do_cx] = children1, children2
+                    new_population = selected.copy()
+                    new_population[0:2 * n_pairs:2], new_population[1:2 * n_pairs:2] = parents1, parents2
+                    new_population = self._mutation(new_population)
+                
+                # 3. Evaluar nueva población
+                with self.profiler.phase('evaluation'):
+                    fitness, breaks = self._evaluate(new_population)
+                gen_best = fitness.argmin()
+                if fitness[gen_best] < best_cost:
+                    best_cost = fitness[gen_best]
+                    best_chromosome = new_population[gen_best].copy()
+                    best_breaks = breaks[gen_best].copy()
+                budget.record(best_cost)
+                
+                # Reemplazo (Elitismo: la peor de la nueva gen por la mejor encontrada)
+                worst = fitness.argmax()
+                new_population[worst] = best_chromosome
+                fitness[worst] = best_cost
+                population = new_population
+            
+            self.best_cost = float(best_cost)
+            if summary_only:
+                yield convergence_snapshot(budget, best_cost, fitness)
+            else:
+                self.best_solution = self._decode_chromosome(best_chromosome, best_breaks)
+                yield convergence_snapshot(budget, best_cost, fitness,
+                                           best_solution=self.best_solution, iteration_costs=fitness.tolist())
         
-        return best_solution, best_cost
+        self.run_stats = budget.summary()
+        self.best_solution = self._decode_chromosome(best_chromosome, best_breaks)
+        self.best_cost = float(best_cost)
+        _post_optimize(self)
+        if self.profiler.enabled:
+            self.run_stats['profile'] = self.profiler.stats()
@@ -1,11 +1,26 @@
-import random
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import numpy as np
-from src.utils import calculate_route_cost, calculate_solution_cost
+from src.algorithms.cws import run_cws
+from src.algorithms.budget import SearchBudget, convergence_snapshot
+from src.algorithms.profiling import Profiler
+from src.data_loader import DEPOT_ID
+from src.local_search import LocalSearch, DEFAULT_NEIGHBORHOODS
+from src.solution import Solution
+from src.utils import get_candidate_lists, get_derived_array
+
+# Almacenamiento de la feromona: matriz densa (N, N) o solo arcos hacia las listas
+# de candidatos (N, k), para instancias donde N x N floats no caben en memoria
+PHEROMONE_STORES = ('dense', 'sparse')
 
 class HybridACO:
     """Implementación de H-ACO (Algoritmo Propuesto)."""
     
-    def __init__(self, problem, n_ants, n_iterations, alpha, beta, rho, q=100):
+    def __init__(self, problem, n_ants, n_iterations, alpha, beta, rho, q=100, seed=None,
+                 n_candidates=None, n_workers=None, time_limit=None, stagnation_limit=None, profiler=None,
+                 pheromone_store='dense', mmas=False, initial_solution=None, initial_pheromone=None,
+                 warm_start_weight=1.0, neighborhoods=DEFAULT_NEIGHBORHOODS):
         self.problem = problem
         self.n_ants = n_ants
         self.n_iterations = n_iterations
@@ -13,6 +28,13 @@ class HybridACO:
         self.beta = beta     # Influencia heurística (distancia)
         self.rho = rho       # Tasa de evaporación
         self.q = q           # Constante de depósito de feromona
+        self.n_workers = n_workers # Procesos para las hormigas (None/1 = secuencial)
+        self.time_limit = time_limit             # Presupuesto de tiempo (seg), None = sin límite
+        self.stagnation_limit = stagnation_limit # Iteraciones sin mejora antes de parar
+        self.profiler = profiler or Profiler() # Tiempos por fase y contadores (apagado por defecto)
+        self.mmas = mmas # Límites MAX-MIN de la feromona (tau_min, tau_max)
+        self.seed_seq = np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_seq)
         
         self.dist_matrix = problem['dist_matrix']
         self.demands = problem['demands']
@@ -20,191 +42,493 @@ class HybridACO:
         self.customer_nodes = problem['customer_nodes']
         self.n_nodes = problem['num_nodes']
         
-        # Inicializar feromonas
-        self.pheromone = np.ones((self.n_nodes, self.n_nodes))
+        # Listas de candidatos (k vecinos más cercanos) para construcción y VNS
+        self.candidate_lists = get_candidate_lists(problem, n_candidates)
+        # Búsqueda local de cada hormiga (vecindarios de src/local_search.py)
+        self.local_search = LocalSearch(problem, neighborhoods, n_candidates, self.profiler)
+        
+        if pheromone_store not in PHEROMONE_STORES:
+            raise ValueError(f"Almacenamiento de feromona desconocido: {pheromone_store}")
+        self.pheromone_store = pheromone_store
         
-        # Inicializar heurística (inverso de la distancia)
-        self.heuristic = np.zeros((self.n_nodes, self.n_nodes))
-        for i in range(self.n_nodes):
-            for j in range(self.n_nodes):
-                if i != j and self.dist_matrix[i, j] > 0:
-                    self.heuristic[i, j] = 1.0 / self.dist_matrix[i, j]
+        if pheromone_store == 'dense':
+            # Inicializar feromonas y heurística (inverso de la distancia), N x N
+            self.pheromone = np.ones((self.n_nodes, self.n_nodes))
+            self.heuristic = get_derived_array(problem, 'heuristic', self._dense_heuristic, mmap=True)
+        else:
+            # Solo los arcos i -> candidate_lists[i, c]: memoria O(N·k). El resto de
+            # arcos solo se usa cuando ningún candidato es factible, y entonces se
+            # elige por la heurística (calculada al vuelo para esas filas).
+            rows = np.arange(self.n_nodes)[:, None]
+            self.pheromone = np.ones(self.candidate_lists.shape)
+            self.heuristic = get_derived_array(
+                problem, f'heuristic-k{self.candidate_lists.shape[1]}',
+                lambda: _inverse_distance(self.dist_matrix[rows, self.candidate_lists]), mmap=True
+            )
 
         self.best_solution = None
         self.best_cost = float('inf')
+        self.run_stats = None # Iteraciones, tiempo, time-to-best y motivo de parada
+        
+        # Arranque en caliente (opcional): feromona de una corrida anterior y/o una
+        # solución inicial como incumbente ('cws' = la solución de run_cws)
+        if initial_pheromone is not None:
+            self.load_pheromone(initial_pheromone)
+        if initial_solution is not None:
+            if isinstance(initial_solution, str) and initial_solution == 'cws':
+                initial_solution, _ = run_cws(problem)
+            self._seed_solution(initial_solution, warm_start_weight)
+
+    def _dense_heuristic(self):
+        """Heurística (inverso de la distancia) N x N, con la diagonal a cero."""
+        heuristic = _inverse_distance(self.dist_matrix)
+        np.fill_diagonal(heuristic, 0.0)
+        return heuristic
+
+    def _seed_solution(self, routes, weight):
+        """
+        Toma 'routes' (lista de listas de índices de matriz, p. ej. la salida de run_cws)
+        como mejor solución inicial y refuerza sus arcos con 'weight' veces
+        tau_max = n_ants·q / (rho·costo), la feromona estacionaria de un arco que
+        siguieran todas las hormigas (el sesgo queda en la escala de los depósitos).
+        """
+        solution = Solution.from_routes(routes, self.problem)
+        visited = sorted(solution.tour)
+        if visited != sorted(self.customer_nodes):
+            raise ValueError("La solución inicial debe visitar cada cliente exactamente una vez")
+        if max(solution.loads) > self.capacity:
+            raise ValueError("La solución inicial excede la capacidad del vehículo")
+        
+        self.best_solution = solution.to_routes()
+        self.best_cost = solution.total_cost()
+        if weight > 0:
+            src, dst, _ = self._ant_edges([(self.best_solution, self.best_cost)])
+            tau_max = self.n_ants * self.q / (self.rho * self.best_cost)
+            index, _ = self._pheromone_index(src, dst)
+            np.add.at(self.pheromone, index, weight * tau_max)
+        if self.mmas:
+            np.clip(self.pheromone, *self._pheromone_bounds(), out=self.pheromone)
+
+    def pheromone_state(self):
+        """
+        Feromona actual con los IDs de cliente de cada índice (el depósito es DEPOT_ID),
+        para reutilizarla en otra instancia con clientes en común (initial_pheromone):
+        {'ids': (N,), 'pheromone': (N, N) o (N, k)} y, con la feromona dispersa,
+        'candidates': (N, k) con los índices de destino de cada columna.
+        """
+        idx_to_id = self.problem['idx_to_id']
+        state = {
+            'ids': np.array([DEPOT_ID] + [idx_to_id[i] for i in range(1, self.n_nodes)]),
+            'pheromone': self.pheromone.copy()
+        }
+        if self.pheromone_store == 'sparse':
+            state['candidates'] = self.candidate_lists.copy()
+        return state
+
+    def save_pheromone(self, path):
+        """Guarda pheromone_state() en un archivo .npz."""
+        np.savez(path, **self.pheromone_state())
+
+    def load_pheromone(self, saved):
+        """
+        Carga la feromona de otra corrida: un dict de pheromone_state() o la ruta de un
+        .npz de save_pheromone(). Los arcos entre nodos presentes en ambas instancias
+        conservan su valor (reasignados por ID con id_to_idx); el resto, p. ej. los de
+        clientes nuevos, reciben la media de los valores importados.
+        """
+        if not isinstance(saved, Mapping):
+            with np.load(saved) as data:
+                saved = {key: data[key] for key in data.files}
+        tau = np.asarray(saved['pheromone'], dtype=float)
+        n_saved = tau.shape[0]
+        
+        # Arcos guardados como posiciones (origen, destino) de la corrida anterior
+        src = np.repeat(np.arange(n_saved), tau.shape[1])
+        if 'candidates' in saved:
+            dst = np.asarray(saved['candidates']).ravel()
+        else:
+            dst = np.tile(np.arange(n_saved), n_saved)
+        
+        # Posición anterior -> índice en esta instancia (-1 si el nodo ya no está)
+        index = {DEPOT_ID: 0, **self.problem['id_to_idx']}
+        local = np.array([index.get(node_id, -1) for node_id in np.asarray(saved['ids']).tolist()])
+        src, dst, values = local[src], local[dst], tau.ravel()
+        keep = (src >= 0) & (dst >= 0) & (src != dst)
+        if not keep.any():
+            raise ValueError("La feromona guardada no tiene arcos entre nodos de esta instancia")
+        
+        self.pheromone[:] = values[keep].mean()
+        values = values[keep]
+        pheromone_index, found = self._pheromone_index(src[keep], dst[keep])
+        self.pheromone[pheromone_index] = values if found is None else values[found]
 
     def run(self):
-        for _ in range(self.n_iterations):
-            all_ant_solutions = []
-            
-            for _ in range(self.n_ants):
-                # 1. Construir solución
-                ant_solution = self._construct_solution()
-                
-                # 2. Hibridación: Aplicar VNS (Búsqueda Local)
-                ant_solution = self._apply_vns(ant_solution)
-                
-                ant_cost = calculate_solution_cost(ant_solution, self.dist_matrix)
-                
-                all_ant_solutions.append((ant_solution, ant_cost))
+        """
+        Ejecuta la colonia hasta agotar las iteraciones, el presupuesto de tiempo o el
+        límite de estancamiento (lo que ocurra primero; se comprueba entre iteraciones).
+        Devuelve la mejor solución encontrada; el detalle queda en self.run_stats.
+        """
+        for _ in self.iter_run(summary_only=True):
+            pass
+        return self.best_solution, self.best_cost
+
+    def iter_run(self, summary_only=False, with_entropy=False):
+        """
+        Igual que run(), pero como generador: entrega un resumen por iteración
+        (iteración, mejor costo, costo medio de las hormigas y tiempo). Con
+        summary_only=False el resumen incluye además la mejor solución y los costos
+        de las hormigas; con summary_only=True solo contiene escalares (memoria
+        constante). Con with_entropy=True incluye la entropía de la feromona, que
+        recorre toda la matriz en cada iteración (por eso es opcional).
+        """
+        if self.n_workers and self.n_workers > 1:
+            yield from self._iter_run_parallel(summary_only, with_entropy)
+            return
+        
+        budget = SearchBudget(self.n_iterations, self.time_limit, self.stagnation_limit)
+        if self.best_solution is not None:
+            budget.record(self.best_cost) # Incumbente del arranque en caliente
+        while budget.next_iteration():
+            with self.profiler.iteration():
+                # 1-2. Construir y mejorar (VNS) las soluciones de todas las hormigas
+                all_ant_solutions = self._build_ants(self.n_ants)
+                self._update_best(all_ant_solutions)
+                budget.record(self.best_cost)
                 
-                if ant_cost < self.best_cost:
-                    self.best_solution = ant_solution
-                    self.best_cost = ant_cost
+                # 3. Actualizar Feromonas
+                with self.profiler.phase('pheromone_update'):
+                    self._update_pheromones(all_ant_solutions)
+            yield self._snapshot(budget, all_ant_solutions, summary_only, with_entropy)
             
-            # 3. Actualizar Feromonas
-            self._update_pheromones(all_ant_solutions)
+        self._finish_run(budget)
+
+    def _iter_run_parallel(self, summary_only, with_entropy):
+        """
+        Igual que iter_run(), pero repartiendo las hormigas de cada iteración entre
+        'n_workers' procesos. La matriz de feromonas vive en memoria compartida
+        (los procesos la leen sin copiarla) y cada lote de hormigas recibe su
+        propio flujo aleatorio derivado de la semilla de la colonia.
+        """
+        shm = shared_memory.SharedMemory(create=True, size=self.pheromone.nbytes)
+        local_pheromone = self.pheromone
+        try:
+            self.pheromone = np.ndarray(local_pheromone.shape, dtype=local_pheromone.dtype, buffer=shm.buf)
+            self.pheromone[:] = local_pheromone
             
-        return self.best_solution, self.best_cost
+            params = {
+                'n_ants': self.n_ants, 'n_iterations': self.n_iterations,
+                'alpha': self.alpha, 'beta': self.beta, 'rho': self.rho, 'q': self.q,
+                'n_candidates': self.candidate_lists.shape[1],
+                'pheromone_store': self.pheromone_store,
+                'neighborhoods': self.local_search.neighborhoods,
+                'profiler': Profiler(enabled=self.profiler.enabled)
+            }
+            n_batches = min(self.n_workers, self.n_ants)
+            batch_sizes = [len(b) for b in np.array_split(np.arange(self.n_ants), n_batches)]
+            
+            budget = SearchBudget(self.n_iterations, self.time_limit, self.stagnation_limit)
+            if self.best_solution is not None:
+                budget.record(self.best_cost) # Incumbente del arranque en caliente
+            with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_ant_worker,
+                                     initargs=(self.problem, params, shm.name)) as pool:
+                while budget.next_iteration():
+                    with self.profiler.iteration():
+                        # 1-2. Construir y mejorar las hormigas en los procesos
+                        # (sus tiempos por fase se suman entre procesos: tiempo de CPU)
+                        seeds = self.seed_seq.spawn(n_batches)
+                        futures = [pool.submit(_run_ant_batch, size, seed)
+                                   for size, seed in zip(batch_sizes, seeds)]
+                        all_ant_solutions = []
+                        for future in futures:
+                            ants, worker_stats = future.result()
+                            all_ant_solutions.extend(ants)
+                            if worker_stats is not None:
+                                self.profiler.merge(worker_stats)
+                        self._update_best(all_ant_solutions)
+                        budget.record(self.best_cost)
+                        
+                        # 3. Actualizar Feromonas (en sitio, sobre la memoria compartida)
+                        with self.profiler.phase('pheromone_update'):
+                            self._update_pheromones(all_ant_solutions)
+                    yield self._snapshot(budget, all_ant_solutions, summary_only, with_entropy)
+            
+            local_pheromone[:] = self.pheromone
+            self._finish_run(budget)
+        finally:
+            self.pheromone = local_pheromone
+            shm.close()
+            shm.unlink()
+
+    def _finish_run(self, budget):
+        """Resumen de la corrida; con el perfilador activo incluye el desglose por fase."""
+        self.run_stats = budget.summary()
+        if self.profiler.enabled:
+            self.run_stats['profile'] = self.profiler.stats()
+
+    def _snapshot(self, budget, all_ant_solutions, summary_only, with_entropy):
+        """Resumen de la iteración para iter_run()."""
+        costs = [cost for _, cost in all_ant_solutions]
+        extra = {}
+        if with_entropy:
+            with self.profiler.phase('entropy'):
+                extra['entropy'] = self._pheromone_entropy()
+        if not summary_only:
+            extra.update(best_solution=self.best_solution, iteration_costs=costs)
+        return convergence_snapshot(budget, self.best_cost, costs, **extra)
+
+    def _pheromone_entropy(self):
+        """
+        Entropía de Shannon media de las filas de la matriz de feromonas, normalizada
+        a [0, 1]: 1 = feromona uniforme (exploración), cerca de 0 = colonia convergida.
+        Con la feromona dispersa se mide sobre los arcos hacia las listas de candidatos.
+        """
+        if self.pheromone_store == 'dense':
+            tau = self.pheromone.copy()
+            np.fill_diagonal(tau, 0.0)
+            n_choices = self.n_nodes - 1
+        else:
+            tau = self.pheromone
+            n_choices = tau.shape[1]
+        if n_choices < 2:
+            return 0.0
+        p = tau / tau.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            h = -np.where(p > 0, p * np.log(p), 0.0).sum(axis=1)
+        return float(h.mean() / np.log(n_choices))
+
+    def _build_ants(self, n_ants):
+        """Construye 'n_ants' soluciones y les aplica la VNS. Devuelve [(solución, costo)]."""
+        ant_solutions = []
+        
+        # 1. Construir las soluciones de todas las hormigas a la vez
+        with self.profiler.phase('construction'):
+            constructed = self._construct_solutions(n_ants)
+        
+        # 2. Hibridación: Aplicar VNS (Búsqueda Local)
+        with self.profiler.phase('vns'):
+            for ant_solution in constructed:
+                ant_solutions.append(self._local_search(ant_solution))
+            
+        return ant_solutions
+
+    def _update_best(self, all_ant_solutions):
+        for ant_solution, ant_cost in all_ant_solutions:
+            if ant_cost < self.best_cost:
+                self.best_solution = ant_solution
+                self.best_cost = ant_cost
 
     def _construct_solution(self):
         """Una hormiga construye una solución completa (múltiples rutas)."""
-        solution = []
-        unvisited = self.customer_nodes.copy()
+        return self._construct_solutions(1)[0]
+
+    def _choice_rows(self, nodes):
+        """
+        Atractivo tau^alpha * eta^beta de los arcos que salen de 'nodes' (filas completas).
+        Con la feromona dispersa los arcos fuera de las listas de candidatos tienen
+        feromona uniforme, así que solo cuenta la heurística.
+        """
+        if self.pheromone_store == 'sparse':
+            heuristic = _inverse_distance(self.dist_matrix[nodes])
+            heuristic[np.arange(len(nodes)), nodes] = 0.0
+            return heuristic ** self.beta
+        return (self.pheromone[nodes] ** self.alpha) * (self.heuristic[nodes] ** self.beta)
+
+    def _candidate_choice(self):
+        """Atractivo de los arcos hacia las listas de candidatos (una vez por iteración)."""
+        if self.pheromone_store == 'sparse':
+            return (self.pheromone ** self.alpha) * (self.heuristic ** self.beta)
+        rows = np.arange(self.n_nodes)[:, None]
+        return (self.pheromone[rows, self.candidate_lists] ** self.alpha) * \
+               (self.heuristic[rows, self.candidate_lists] ** self.beta)
+
+    def _roulette(self, weights, feasible):
+        """
+        Selección por ruleta vectorizada: una columna por fila de 'weights'.
+        Si una fila no tiene feromona/heurística, se elige al azar entre las factibles.
+        """
+        weights = weights * feasible
+        no_info = weights.sum(axis=1) <= 0
+        if no_info.any():
+            weights[no_info] = feasible[no_info]
+        
+        cumulative = np.cumsum(weights, axis=1)
+        totals = cumulative[:, -1]
+        r = np.minimum(self.rng.random(len(weights)) * totals, np.nextafter(totals, 0))
+        return np.argmax(cumulative > r[:, None], axis=1)
+
+    def _construct_solutions(self, n_ants):
+        """
+        Construye las soluciones de 'n_ants' hormigas en paralelo (vectorizado).
+        Cada paso avanza a todas las hormigas a la vez usando máscaras 2D de
+        nodos visitados y la carga restante de cada hormiga. El siguiente nodo se
+        elige entre la lista de candidatos del nodo actual y solo se recurre al
+        conjunto completo cuando ningún candidato es factible.
+        """
+        candidates = self.candidate_lists
+        candidate_choice = self._candidate_choice()
+        n_customers = len(self.customer_nodes)
+        
+        # Nodos que NO deben visitarse (depósito y nodos fuera de customer_nodes)
+        visited = np.ones((n_ants, self.n_nodes), dtype=bool)
+        visited[:, self.customer_nodes] = False
         
-        while unvisited:
-            current_route = []
-            current_load = 0
-            current_node = 0 # Empezar en el depósito
+        load = np.zeros(n_ants)
+        current = np.zeros(n_ants, dtype=int) # Todas empiezan en el depósito
+        remaining = np.full(n_ants, n_customers)
+        ants = np.arange(n_ants)
+        
+        # Recorrido de cada hormiga; 0 = regreso al depósito (fin de ruta)
+        tours = np.zeros((n_ants, 2 * n_customers), dtype=int)
+        step = 0
+        
+        while remaining.any():
+            # Candidatos factibles del nodo actual de cada hormiga
+            cand = candidates[current]
+            cand_feasible = ~visited[ants[:, None], cand] & \
+                            (load[:, None] + self.demands[cand] <= self.capacity)
+            cand_feasible[remaining == 0] = False
+            cand_movers = np.flatnonzero(cand_feasible.any(axis=1))
             
-            while True:
-                # Encontrar siguientes paradas factibles
-                feasible_next = []
-                for node in unvisited:
-                    if current_load + self.demands[node] <= self.capacity:
-                        feasible_next.append(node)
-                
-                if not feasible_next:
-                    break # Ruta llena, volver al depósito
-                    
-                # Calcular probabilidades
-                probs = self._calculate_probabilities(current_node, feasible_next)
-                
-                # Seleccionar siguiente nodo (ruleta)
-                next_node = random.choices(feasible_next, weights=probs, k=1)[0]
-                
-                current_route.append(next_node)
-                current_load += self.demands[next_node]
-                unvisited.remove(next_node)
-                current_node = next_node
+            # Sin candidatos factibles: buscar en el conjunto completo
+            fallback = np.flatnonzero((remaining > 0) & ~cand_feasible.any(axis=1))
+            full_feasible = ~visited[fallback] & \
+                            (load[fallback, None] + self.demands[None, :] <= self.capacity)
+            has_move = full_feasible.any(axis=1)
             
-            if current_route:
-                solution.append(current_route)
-                
-        return solution
-
-    def _calculate_probabilities(self, current_node, feasible_nodes):
-        probs = []
-        for node in feasible_nodes:
-            tau = self.pheromone[current_node, node] ** self.alpha
-            eta = self.heuristic[current_node, node] ** self.beta
-            probs.append(tau * eta)
+            # Hormigas sin paradas factibles: ruta llena, volver al depósito
+            closing = fallback[~has_move]
+            if np.any(load[closing] == 0):
+                raise ValueError("Hay clientes con demanda mayor que la capacidad del vehículo")
+            load[closing] = 0
             
-        total_prob = sum(probs)
-        if total_prob == 0: # Si no hay feromona/heurística, elegir al azar
-            return [1.0 / len(feasible_nodes)] * len(feasible_nodes)
+            next_nodes = np.empty(0, dtype=int)
+            if cand_movers.size:
+                cols = self._roulette(candidate_choice[current[cand_movers]], cand_feasible[cand_movers])
+                next_nodes = cand[cand_movers, cols]
+            full_movers = fallback[has_move]
+            if full_movers.size:
+                full_next = self._roulette(self._choice_rows(current[full_movers]), full_feasible[has_move])
+                next_nodes = np.concatenate((next_nodes, full_next))
+            current[closing] = 0
             
-        return [p / total_prob for p in probs]
+            movers = np.concatenate((cand_movers, full_movers))
+            if movers.size:
+                tours[movers, step] = next_nodes
+                visited[movers, next_nodes] = True
+                load[movers] += self.demands[next_nodes]
+                current[movers] = next_nodes
+                remaining[movers] -= 1
+            step += 1
+        
+        solutions = []
+        for tour in tours[:, :step]:
+            solution = []
+            for route in np.split(tour, np.flatnonzero(tour == 0)):
+                route = route[route != 0]
+                if route.size:
+                    solution.append(route.tolist())
+            solutions.append(solution)
+        return solutions
 
     def _apply_vns(self, solution):
         """
         Aplica Variable Neighborhood Search (VNS) para mejorar la solución de la hormiga.
         Esta es la parte "Híbrida" (H-ACO).
+        Recibe y devuelve el formato lista de listas (ver _local_search).
         """
-        improved_solution = solution
-        cost_solution = calculate_solution_cost(improved_solution, self.dist_matrix)
-
-        # Definir vecindarios (simplificado: 2-opt intra-ruta y re-inserción inter-ruta)
-        neighborhoods = [self._vns_2opt, self._vns_relocate]
-        k = 0
-        while k < len(neighborhoods):
-            new_solution, new_cost = neighborhoods[k](improved_solution, cost_solution)
-            if new_cost < cost_solution:
-                improved_solution = new_solution
-                cost_solution = new_cost
-                k = 0 # Volver al primer vecindario
-            else:
-                k += 1 # Probar siguiente vecindario
-                
-        return improved_solution
+        return self._local_search(solution)[0]
 
-    def _vns_2opt(self, solution, original_cost):
-        """Neighborhood 1: 2-opt (Intra-Ruta)."""
-        best_solution = [r[:] for r in solution] # Copia profunda
-        best_cost = original_cost
-        
-        for r_idx, route in enumerate(best_solution):
-            if len(route) < 2: continue
-            
-            for i in range(len(route) - 1):
-                for j in range(i + 1, len(route)):
-                    # [..., i, i+1, ..., j, j+1, ...] -> [..., i, j, ..., i+1, j+1, ...]
-                    new_route = route[:i+1] + list(reversed(route[i+1:j+1])) + route[j+1:]
-                    
-                    # Calcular nuevo costo (delta)
-                    old_cost = calculate_route_cost(route, self.dist_matrix)
-                    new_cost = calculate_route_cost(new_route, self.dist_matrix)
-                    
-                    if new_cost < old_cost:
-                        delta_cost = new_cost - old_cost
-                        best_solution[r_idx] = new_route
-                        best_cost += delta_cost
-                        return best_solution, best_cost # Retornar en la primera mejora
-        return best_solution, best_cost # Retornar la original si no hay mejora
-
-    def _vns_relocate(self, solution, original_cost):
-        """Neighborhood 2: Re-inserción (Inter-Ruta)."""
-        best_solution = [r[:] for r in solution]
-        best_cost = original_cost
-        
-        for r1_idx, route1 in enumerate(best_solution):
-            for node_idx, node_to_move in enumerate(route1):
-                
-                # Probar mover 'node_to_move' a otra ruta
-                for r2_idx, route2 in enumerate(best_solution):
-                    if r1_idx == r2_idx: continue
-                    
-                    # Verificar capacidad
-                    route2_load = sum(self.demands[n] for n in route2)
-                    if route2_load + self.demands[node_to_move] > self.capacity:
-                        continue
-                        
-                    # Probar insertar en cada posición de route2
-                    for insert_pos in range(len(route2) + 1):
-                        new_route1 = route1[:node_idx] + route1[node_idx+1:]
-                        new_route2 = route2[:insert_pos] + [node_to_move] + route2[insert_pos:]
-                        
-                        # Calcular costo delta
-                        old_cost = calculate_route_cost(route1, self.dist_matrix) + \
-                                   calculate_route_cost(route2, self.dist_matrix)
-                        new_cost = calculate_route_cost(new_route1, self.dist_matrix) + \
-                                   calculate_route_cost(new_route2, self.dist_matrix)
-                                   
-                        if new_cost < old_cost:
-                            new_solution_set = [r[:] for r in solution]
-                            new_solution_set[r1_idx] = new_route1
-                            new_solution_set[r2_idx] = new_route2
-                            # Limpiar rutas vacías
-                            new_solution_set = [r for r in new_solution_set if r]
-                            
-                            delta_cost = new_cost - old_cost
-                            return new_solution_set, original_cost + delta_cost # Retornar en primera mejora
-
-        return best_solution, best_cost # Retornar la original si no hay mejora
+    def _local_search(self, solution):
+        """
+        VNS sobre una solución (lista de rutas), ver src/local_search.py: don't-look
+        bits por nodo y solo las rutas modificadas se vuelven a revisar.
+        Devuelve (rutas, costo).
+        """
+        return self.local_search.improve(solution)
 
     def _update_pheromones(self, all_ant_solutions):
+        """
+        Evaporación y depósito (q / costo en cada arco recorrido por cada hormiga).
+        Los depósitos se aplican con un único np.add.at sobre los arcos de todas las
+        hormigas; con mmas=True se acotan además a [tau_min, tau_max] en sitio.
+        """
+        src, dst, deposits = self._ant_edges(all_ant_solutions)
+        
         # 1. Evaporación
         self.pheromone *= (1.0 - self.rho)
         
         # 2. Depósito (basado en la calidad de la solución)
+        index, found = self._pheromone_index(src, dst)
+        np.add.at(self.pheromone, index, deposits if found is None else deposits[found])
+        
+        # 3. Límites MAX-MIN
+        if self.mmas:
+            np.clip(self.pheromone, *self._pheromone_bounds(), out=self.pheromone)
+
+    def _pheromone_index(self, src, dst):
+        """
+        Índice en self.pheromone de los arcos (src, dst) y máscara de los que están
+        guardados (None con la feromona densa, donde están todos). Con la feromona
+        dispersa solo están los arcos hacia la lista de candidatos del origen.
+        """
+        if self.pheromone_store == 'dense':
+            return (src, dst), None
+        # Columna de cada arco en la lista de candidatos de su origen (si está)
+        match = self.candidate_lists[src] == dst[:, None]
+        found = match.any(axis=1)
+        return (src[found], match[found].argmax(axis=1)), found
+
+    def _ant_edges(self, all_ant_solutions):
+        """Arcos (origen, destino) recorridos por todas las hormigas y el depósito de cada uno."""
+        src, dst, n_edges, deposit = [], [], [], []
         for solution, cost in all_ant_solutions:
-            pheromone_deposit = self.q / cost
-            
+            tour = [0]
             for route in solution:
-                # Depósito -> Primer cliente
-                self.pheromone[0, route[0]] += pheromone_deposit
-                # Cliente -> Cliente
-                for i in range(len(route) - 1):
-                    self.pheromone[route[i], route[i+1]] += pheromone_deposit
-                # Último cliente -> Depósito
-                self.pheromone[route[-1], 0] += pheromone_deposit
+                tour.extend(route)
+                tour.append(0) # Regreso al depósito
+            src.extend(tour[:-1])
+            dst.extend(tour[1:])
+            n_edges.append(len(tour) - 1)
+            deposit.append(self.q / cost)
+        return (np.asarray(src, dtype=np.intp), np.asarray(dst, dtype=np.intp),
+                np.repeat(deposit, n_edges))
+
+    def _pheromone_bounds(self):
+        """
+        Límites MAX-MIN: tau_max es el valor estacionario si todas las hormigas
+        depositaran q / mejor costo cada iteración; tau_min = tau_max / (2N).
+        """
+        tau_max = self.n_ants * self.q / (self.rho * self.best_cost)
+        return tau_max / (2 * self.n_nodes), tau_max
+
+def _inverse_distance(dist):
+    """1 / distancia elemento a elemento (0 donde la distancia es 0)."""
+    dist = np.asarray(dist, dtype=float)
+    return np.divide(1.0, dist, out=np.zeros(dist.shape), where=dist > 0)
+
+
+# ==============================================================================
+# Procesos trabajadores (ejecución paralela de hormigas)
+# ==============================================================================
+
+_worker_colony = None # Colonia local de cada proceso trabajador
+_worker_shm = None    # Memoria compartida con la matriz de feromonas
+
+def _init_ant_worker(problem, params, shm_name):
+    """Inicializa el proceso: colonia local cuya feromona es la memoria compartida."""
+    global _worker_colony, _worker_shm
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_colony = HybridACO(problem, **params)
+    _worker_colony.pheromone = np.ndarray(
+        _worker_colony.pheromone.shape, dtype=_worker_colony.pheromone.dtype, buffer=_worker_shm.buf
+    )
+
+def _run_ant_batch(n_ants, seed):
+    """
+    Construye y mejora un lote de hormigas con su propio flujo aleatorio.
+    Devuelve (hormigas, estadísticas del perfilador del lote o None si está apagado).
+    """
+    _worker_colony.rng = np.random.default_rng(seed)
+    ants = _worker_colony._build_ants(n_ants)
+    profiler = _worker_colony.profiler
+    return ants, (profiler.pop_stats() if profiler.enabled else None)
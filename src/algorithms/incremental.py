@@ -0,0 +1,93 @@
+from array import array
+from bisect import bisect_right
+import numpy as np
+from src.algorithms.h_aco import HybridACO
+from src.data_loader import update_problem_instance
+from src.local_search import LocalSearch, DEFAULT_NEIGHBORHOODS
+from src.solution import Solution
+
+def reoptimize(problem, solution, all_customers_df, added_ids=(), removed_ids=(), master=None,
+               local_search=True, aco_params=None):
+    """
+    Re-optimización incremental cuando el escenario cambia en unos pocos clientes,
+    sin reconstruir la instancia ni volver a ejecutar un algoritmo desde cero.
+    1. Quita cada cliente de 'removed_ids' de su ruta (delta de costo O(1)).
+    2. Actualiza 'problem' en sitio (update_problem_instance).
+    3. Inserta cada cliente de 'added_ids' en su posición factible más barata,
+       o en una ruta nueva si no cabe en ninguna.
+    4. Pulido: VNS (src/local_search.py, con los vecindarios 'local_search' o los de
+       H-ACO si es True) solo sobre las rutas afectadas y, con 'aco_params'
+       (kwargs de HybridACO), una corrida corta de H-ACO que arranca desde el resultado.
+    'solution' son las rutas con los índices de la instancia ANTES del cambio.
+    Devuelve (rutas, costo) con los índices de la instancia actualizada.
+    """
+    current = Solution.from_routes(solution, problem)
+    dist, demands = problem['dist_matrix'], problem['demands']
+    affected = set() # Nodos junto a los que cambió alguna ruta
+
+    # 1. Quitar clientes (índices anteriores)
+    for cid in removed_ids:
+        try:
+            u = problem['id_to_idx'][cid]
+        except KeyError:
+            raise KeyError(f"Cliente {cid} no está en la instancia") from None
+        pos = current.tour.index(u)
+        r = bisect_right(current.offsets, pos) - 1
+        a = current.tour[pos - 1] if pos > current.offsets[r] else 0
+        b = current.tour[pos + 1] if pos + 1 < current.offsets[r + 1] else 0
+        current.remove(r, pos - current.offsets[r], demands[u], dist[a, b] - dist[a, u] - dist[u, b])
+        affected.update((a, b))
+
+    # 2. Instancia actualizada: reasignar los índices de la solución
+    old_to_new = update_problem_instance(problem, all_customers_df, added_ids, removed_ids, master)
+    current.tour = array('q', old_to_new[np.frombuffer(current.tour, dtype=np.int64)].tolist())
+    affected = {int(old_to_new[node]) for node in affected if node != 0 and old_to_new[node] > 0}
+
+    # 3. Inserción más barata (primero los clientes de mayor demanda, los más difíciles de ubicar)
+    dist, demands = problem['dist_matrix'], problem['demands']
+    added = sorted((problem['id_to_idx'][cid] for cid in added_ids), key=lambda u: -demands[u])
+    for u in added:
+        r, i, delta = _cheapest_insertion(current, u, dist, demands[u], problem['capacity'])
+        current.insert(r, i, u, demands[u], delta)
+        affected.add(u)
+
+    # 4. Pulido
+    if local_search and affected:
+        neighborhoods = DEFAULT_NEIGHBORHOODS if local_search is True else local_search
+        current = _polish_routes(problem, current, affected, neighborhoods)
+    routes, cost = current.to_routes(), current.total_cost()
+    if aco_params:
+        routes, cost = HybridACO(problem, initial_solution=routes, **aco_params).run()
+    return routes, cost
+
+def _cheapest_insertion(solution, u, dist, demand, capacity):
+    """
+    Posición factible (ruta, índice) de menor costo para insertar 'u' y su delta
+    d(prev, u) + d(u, next) - d(prev, next), con todas las posiciones evaluadas a la vez.
+    Si no cabe en ninguna ruta, abre una nueva (ruta n_routes).
+    """
+    tour = np.frombuffer(solution.tour, dtype=np.int64)
+    offsets = np.frombuffer(solution.offsets, dtype=np.int64)
+    # Recorrido con el depósito al inicio de cada ruta y al final: cada par de
+    # nodos consecutivos es una posición de inserción
+    path = np.append(np.insert(tour, offsets[:-1], 0), 0)
+    prev, nxt = path[:-1], path[1:]
+    route = np.cumsum(prev == 0) - 1
+
+    feasible = np.frombuffer(solution.loads)[route] + demand <= capacity
+    if not feasible.any():
+        return solution.n_routes, 0, dist[0, u] + dist[u, 0]
+    delta = np.where(feasible, dist[prev, u] + dist[u, nxt] - dist[prev, nxt], np.inf)
+    s = int(np.argmin(delta))
+    r = int(route[s])
+    return r, s - offsets[r] - r, float(delta[s])
+
+def _polish_routes(problem, solution, affected, neighborhoods):
+    """VNS limitada a las rutas con nodos afectados."""
+    routes = solution.to_routes()
+    touched = {r for r, route in enumerate(routes) if affected.intersection(route)}
+    # Mismo k que las listas ya parcheadas (otro k las reconstruiría enteras)
+    engine = LocalSearch(problem, neighborhoods, n_candidates=problem['candidate_lists'].shape[1])
+    polished, _ = engine.improve([routes[r] for r in sorted(touched)])
+    kept = [route for r, route in enumerate(routes) if r not in touched]
+    return Solution.from_routes(kept + polished, problem)
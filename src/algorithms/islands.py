@@ -0,0 +1,206 @@
+from itertools import islice
+import multiprocessing
+import os
+import time
+import traceback
+import numpy as np
+from src.algorithms.h_aco import HybridACO
+
+class IslandACO:
+    """
+    Modelo de islas para H-ACO: 'n_islands' colonias HybridACO independientes, cada
+    una en su propio proceso, con su semilla y (opcionalmente) sus propios parámetros.
+    Cada 'migration_interval' iteraciones las islas se comunican en anillo: la isla i
+    recibe la mejor solución de la isla i-1 y, si mejora la suya, la adopta como
+    incumbente y refuerza sus arcos con 'migration_weight' veces tau_max (el mismo
+    sesgo que el arranque en caliente). Solo viajan rutas por un Pipe, nunca matrices.
+    Los parámetros comunes son los de HybridACO; 'island_params' es una lista de dicts
+    (uno por isla) que los sobrescriben, p. ej. distintos alpha/beta por isla.
+    """
+
+    def __init__(self, problem, n_ants, n_iterations, alpha, beta, rho, n_islands=None, island_params=None,
+                 migration_interval=10, migration_weight=1.0, seed=None, **colony_params):
+        if colony_params.get('n_workers') not in (None, 1):
+            raise ValueError("Cada isla ya es un proceso: las colonias no admiten n_workers")
+        if island_params is None:
+            island_params = [{}] * (n_islands or os.cpu_count() or 1)
+        self.problem = problem
+        self.n_iterations = n_iterations
+        self.migration_interval = migration_interval
+        self.migration_weight = migration_weight
+
+        # Parámetros de cada colonia: comunes + propios de la isla + semilla independiente
+        common = {'n_ants': n_ants, 'n_iterations': n_iterations, 'alpha': alpha, 'beta': beta, 'rho': rho,
+                  **colony_params}
+        seeds = np.random.SeedSequence(seed).generate_state(len(island_params)).tolist()
+        self.island_params = [{**common, 'seed': island_seed, **params}
+                              for params, island_seed in zip(island_params, seeds)]
+        self.n_islands = len(self.island_params)
+
+        self.best_solution = None
+        self.best_cost = float('inf')
+        self.run_stats = None # Resumen global y estadísticas de cada isla
+
+    def run(self):
+        """Ejecuta todas las islas hasta que terminen. Devuelve la mejor solución global."""
+        for _ in self.iter_run(summary_only=True):
+            pass
+        return self.best_solution, self.best_cost
+
+    def iter_run(self, summary_only=False):
+        """
+        Generador con un resumen por iteración (como HybridACO.iter_run): mejor costo
+        global, costo medio de las islas y el mejor costo de cada isla. Los resúmenes
+        llegan por bloques de 'migration_interval' iteraciones (una época).
+        """
+        start = time.perf_counter()
+        islands = [_Island(i, self.problem, params, self.migration_weight)
+                   for i, params in enumerate(self.island_params)]
+        try:
+            iteration = 0
+            running_best = float('inf')
+            while not all(island.done for island in islands):
+                # 1. Una época en paralelo; cada isla recibe a su inmigrante
+                active = [island for island in islands if not island.done]
+                for island in active:
+                    island.start_epoch(self.migration_interval)
+                for island in active:
+                    island.finish_epoch()
+
+                best_island = min(islands, key=lambda island: island.best_cost)
+                self.best_solution, self.best_cost = best_island.best_solution, best_island.best_cost
+
+                # 2. Resúmenes por iteración (las islas que ya pararon no aportan)
+                n_steps = max(len(island.history) for island in active)
+                for t in range(n_steps):
+                    iteration += 1
+                    snapshots = [island.history[t] for island in active if t < len(island.history)]
+                    running_best = min(running_best, *(s['best_cost'] for s in snapshots))
+                    snapshot = {
+                        'iteration': iteration,
+                        'best_cost': float(running_best),
+                        'mean_cost': float(np.mean([s['mean_cost'] for s in snapshots])),
+                        'elapsed': time.perf_counter() - start,
+                        'island_best_costs': [s['best_cost'] for s in snapshots]
+                    }
+                    if not summary_only:
+                        snapshot['best_solution'] = self.best_solution # La mejor al final de la época
+                    yield snapshot
+
+                # 3. Migración en anillo: la isla i recibe la mejor de la isla i-1
+                for i, island in enumerate(islands):
+                    source = islands[i - 1]
+                    island.migrant = (source.best_solution, source.best_cost) if source is not island else None
+        finally:
+            for island in islands:
+                island.close()
+
+        self._finish_run(islands, iteration, time.perf_counter() - start)
+
+    def _finish_run(self, islands, iterations, elapsed):
+        """
+        Resumen global. time_to_best es el primer instante (reloj de cada isla, que
+        arranca a la vez que el modelo) en que alguna isla alcanzó el mejor costo.
+        """
+        best_island = min(islands, key=lambda island: island.best_cost)
+        self.best_solution, self.best_cost = best_island.best_solution, best_island.best_cost
+        self.run_stats = {
+            'iterations': iterations,
+            'elapsed': elapsed,
+            'time_to_best': min((s['elapsed'] for island in islands for s in island.all_snapshots
+                                 if s['best_cost'] <= self.best_cost), default=None),
+            'stop_reason': best_island.run_stats['stop_reason'],
+            'islands': [
+                {'params': {name: value for name, value in island.params.items() if name != 'initial_solution'},
+                 'best_cost': island.best_cost, 'migrations_accepted': island.migrations_accepted,
+                 **island.run_stats}
+                for island in islands
+            ]
+        }
+
+class _Island:
+    """Extremo del proceso de una isla (lado del modelo): envía épocas y recibe resultados."""
+
+    def __init__(self, index, problem, params, migration_weight):
+        self.index = index
+        self.params = params
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_island_worker, daemon=True,
+                                               args=(child_conn, problem, params, migration_weight))
+        self.process.start()
+        child_conn.close()
+        self.migrant = None
+        self.done = False
+        self.best_solution = None
+        self.best_cost = float('inf')
+        self.history = []
+        self.all_snapshots = []
+        self.migrations_accepted = 0
+        self.run_stats = None
+
+    def start_epoch(self, n_steps):
+        try:
+            self.conn.send((n_steps, self.migrant))
+        except OSError:
+            pass # El proceso ya terminó (p. ej. por un error): lo informa finish_epoch()
+
+    def finish_epoch(self):
+        """Resultado de la época; si el proceso falló, relanza su error aquí."""
+        try:
+            status, payload = self.conn.recv()
+        except EOFError:
+            raise RuntimeError(f"La isla {self.index} terminó sin responder") from None
+        if status == 'error':
+            raise RuntimeError(f"Error en la isla {self.index}:\n{payload}")
+        (self.best_solution, self.best_cost, self.history,
+         self.migrations_accepted, self.run_stats) = payload
+        self.all_snapshots.extend(self.history)
+        self.done = self.run_stats is not None
+
+    def close(self):
+        if self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.conn.close()
+
+def _island_worker(conn, problem, params, migration_weight):
+    """
+    Proceso de una isla: la colonia avanza con su propio iter_run() (que conserva el
+    estado entre épocas) y entre épocas adopta al inmigrante si mejora su incumbente.
+    Responde ('ok', resultado) por época, o ('error', traza) si algo falla.
+    """
+    try:
+        colony = HybridACO(problem, **params)
+        steps = colony.iter_run(summary_only=True)
+        accepted = 0
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            n_steps, migrant = message
+            incumbent = (colony.best_solution, colony.best_cost)
+            seeded = migrant is not None and migrant[1] < colony.best_cost
+            if seeded:
+                colony._seed_solution(migrant[0], migration_weight)
+            history = list(islice(steps, n_steps))
+            if seeded:
+                if history:
+                    accepted += 1
+                else:
+                    # La colonia ya había parado (tiempo, estancamiento): no lo usa
+                    colony.best_solution, colony.best_cost = incumbent
+            # Última iteración alcanzada: cerrar el generador ya, sin otra época
+            # (así queda fijado run_stats y no llega otro inmigrante)
+            if len(history) == n_steps and history[-1]['iteration'] >= colony.n_iterations:
+                for _ in steps:
+                    pass
+            conn.send(('ok', (colony.best_solution, colony.best_cost, history, accepted, colony.run_stats)))
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        conn.close()
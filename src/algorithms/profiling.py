@@ -0,0 +1,109 @@
+import cProfile
+import json
+import time
+from contextlib import nullcontext
+
+# Contexto vacío compartido: con el perfilador apagado, phase() no crea objetos
+_NO_PHASE = nullcontext()
+
+class _Phase:
+    """Mide una fase (tiempo acumulado y número de llamadas) dentro de un 'with'."""
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        stats = self.profiler.phases.setdefault(self.name, [0.0, 0])
+        stats[0] += time.perf_counter() - self.start
+        stats[1] += 1
+
+class Profiler:
+    """
+    Instrumentación ligera de los algoritmos (H-ACO, GA).
+    - phase(nombre): tiempo acumulado y número de llamadas de una fase.
+    - count(nombre, n): contadores (movimientos evaluados/aceptados, decodificaciones...).
+    - Con cprofile=True, iteration() activa además cProfile durante cada iteración,
+      para exportar estadísticas compatibles con pstats / snakeviz (dump_stats).
+    Apagado (enabled=False, por defecto) cada llamada es una comprobación de un
+    booleano, así que el coste en los bucles calientes es prácticamente nulo.
+    """
+
+    def __init__(self, enabled=False, cprofile=False):
+        self.enabled = enabled or cprofile
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.reset()
+
+    def reset(self):
+        self.phases = {}   # nombre -> [segundos acumulados, llamadas]
+        self.counters = {} # nombre -> total
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NO_PHASE
+        return _Phase(self, name)
+
+    def iteration(self):
+        """Fase 'iteration'; si hay cProfile, lo activa solo mientras dura la iteración."""
+        if self.cprofile is None:
+            return self.phase('iteration')
+        return _ProfiledIteration(self)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, stats):
+        """Suma las estadísticas de otro perfilador (p. ej. de un proceso trabajador)."""
+        for name, phase in stats['phases'].items():
+            total = self.phases.setdefault(name, [0.0, 0])
+            total[0] += phase['time']
+            total[1] += phase['calls']
+        for name, n in stats['counters'].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def stats(self):
+        """Estadísticas como dict serializable: {'phases': {nombre: {time, calls}}, 'counters': {...}}."""
+        return {
+            'phases': {name: {'time': t, 'calls': calls} for name, (t, calls) in self.phases.items()},
+            'counters': dict(self.counters)
+        }
+
+    def pop_stats(self):
+        """Devuelve las estadísticas y las reinicia (envío incremental desde los trabajadores)."""
+        stats = self.stats()
+        self.reset()
+        return stats
+
+    def to_json(self, path=None):
+        """Estadísticas en JSON; si se indica 'path', además se guardan en ese archivo."""
+        text = json.dumps(self.stats(), indent=2)
+        if path is not None:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        return text
+
+    def dump_stats(self, path):
+        """Guarda las estadísticas de cProfile (formato pstats) en 'path'."""
+        if self.cprofile is None:
+            raise ValueError("El perfilador no se creó con cprofile=True")
+        self.cprofile.dump_stats(path)
+
+class _ProfiledIteration(_Phase):
+    """Fase 'iteration' con cProfile activo (no se mide el código del llamador entre iteraciones)."""
+    __slots__ = ()
+
+    def __init__(self, profiler):
+        super().__init__(profiler, 'iteration')
+
+    def __enter__(self):
+        self.profiler.cprofile.enable()
+        super().__enter__()
+
+    def __exit__(self, *exc):
+        super().__exit__(*exc)
+        self.profiler.cprofile.disable()
@@ -0,0 +1,202 @@
+"""
+Ejecución por lotes (sin interfaz) de una malla escenario x algoritmo x semilla.
+
+Los resultados se escriben (CSV o JSON lines) a medida que terminan las corridas,
+repartidas entre varios procesos. No importa Streamlit ni Plotly.
+
+Uso:
+    python -m src.cli                                      # S-1..S-10, los 3 algoritmos, semilla 0
+    python -m src.cli --scenarios S-3 S-6 --seeds 0 1 2 --workers 8 --output resultados.csv
+    python -m src.cli --synthetic 1000:mixed:7 --vrp X-n101-k25.vrp --format jsonl
+    python -m src.cli --algorithms H-ACO --haco n_ants=30 n_iterations=200 --time-limit 60
+    python -m src.cli --cws local_search=true --ga 'local_search=["2opt", "swap"]'
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.data_loader import load_customer_data, get_simulation_scenarios, setup_problem_instance, \
+    generate_instance, load_vrp_file, INSTANCE_KINDS
+from src.experiment import ALGORITHMS, DETERMINISTIC_ALGORITHMS, run_algorithm
+
+OUTPUT_FORMATS = ('csv', 'jsonl')
+FIELDS = ['scenario', 'algorithm', 'seed', 'cost', 'time', 'time_to_best', 'stop_reason',
+          'iterations', 'n_routes', 'routes']
+
+# Parámetros por defecto (los mismos que la app por defecto)
+DEFAULT_PARAMS = {
+    'GA': {'pop_size': 40, 'generations': 100},
+    'H-ACO': {'n_ants': 20, 'n_iterations': 100, 'alpha': 1.0, 'beta': 5.0, 'rho': 0.1}
+}
+
+def parse_instance_specs(scenarios=(), synthetic=(), vrp=()):
+    """
+    Especificaciones de instancia {nombre: spec}; cada proceso construye sus instancias
+    a partir de ellas (no se envían matrices entre procesos).
+    - Escenario: 'S-3'.  - Sintética: 'N[:tipo[:semilla]]'.  - Archivo: ruta a un .vrp.
+    """
+    known = get_simulation_scenarios()
+    specs = {}
+    for name in scenarios:
+        if name not in known:
+            raise ValueError(f"Escenario desconocido: {name} (opciones: {', '.join(known)})")
+        specs[name] = ('scenario', name)
+    for text in synthetic:
+        parts = text.split(':')
+        n_customers = int(parts[0])
+        kind = parts[1] if len(parts) > 1 else 'random'
+        seed = int(parts[2]) if len(parts) > 2 else 0
+        if kind not in INSTANCE_KINDS:
+            raise ValueError(f"Tipo de instancia desconocido: {kind} (opciones: {INSTANCE_KINDS})")
+        specs[f"synthetic-{n_customers}-{kind}-{seed}"] = ('synthetic', n_customers, kind, seed)
+    for path in vrp:
+        specs[os.path.splitext(os.path.basename(path))[0]] = ('vrp', os.path.abspath(path))
+    return specs
+
+def build_instance(spec):
+    kind = spec[0]
+    if kind == 'scenario':
+        return setup_problem_instance(load_customer_data(), get_simulation_scenarios()[spec[1]])
+    if kind == 'synthetic':
+        return generate_instance(spec[1], spec[2], seed=spec[3])
+    return load_vrp_file(spec[1])
+
+def parse_params(pairs):
+    """['n_ants=30', 'rho=0.2'] -> {'n_ants': 30, 'rho': 0.2} (valores JSON; si no, texto)."""
+    params = {}
+    for pair in pairs or []:
+        name, sep, value = pair.partition('=')
+        if not sep:
+            raise ValueError(f"Parámetro mal formado (se espera nombre=valor): {pair}")
+        try:
+            params[name] = json.loads(value)
+        except json.JSONDecodeError:
+            params[name] = value
+    return params
+
+def build_jobs(specs, algorithms, seeds):
+    """Malla (escenario, algoritmo, semilla); los algoritmos deterministas se ejecutan una vez."""
+    jobs = []
+    for name in specs:
+        for algorithm in algorithms:
+            for seed in ([None] if algorithm in DETERMINISTIC_ALGORITHMS else seeds):
+                jobs.append((name, algorithm, seed))
+    return jobs
+
+def iter_batch(specs, jobs, params, n_workers=None):
+    """Ejecuta los trabajos en 'n_workers' procesos; entrega cada fila en cuanto termina."""
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if n_workers <= 1:
+        _init_batch_worker(specs)
+        for name, algorithm, seed in jobs:
+            yield _run_batch_job(name, algorithm, params.get(algorithm), seed)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_batch_worker,
+                             initargs=(specs,)) as pool:
+        futures = [pool.submit(_run_batch_job, name, algorithm, params.get(algorithm), seed)
+                   for name, algorithm, seed in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+class ResultWriter:
+    """Escribe filas de resultados en CSV o JSON lines, vaciando el búfer tras cada una."""
+
+    def __init__(self, stream, output_format='csv', with_routes=True):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato desconocido: {output_format} (opciones: {OUTPUT_FORMATS})")
+        self.stream = stream
+        self.output_format = output_format
+        self.fields = FIELDS if with_routes else [f for f in FIELDS if f != 'routes']
+        self._csv = None
+        if output_format == 'csv':
+            self._csv = csv.DictWriter(stream, fieldnames=self.fields, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, row):
+        if self._csv is not None:
+            row = dict(row, routes=json.dumps(row['routes']))
+            self._csv.writerow(row)
+        else:
+            self.stream.write(json.dumps({f: row[f] for f in self.fields}) + '\n')
+        self.stream.flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ejecución por lotes de CWS, GA y H-ACO (sin interfaz).")
+    parser.add_argument('--scenarios', nargs='*', default=None,
+                        help="Escenarios de la Tabla 2 (por defecto todos, si no se dan otras instancias).")
+    parser.add_argument('--synthetic', nargs='*', default=[], metavar='N[:TIPO[:SEMILLA]]',
+                        help="Instancias sintéticas, p. ej. 500:clustered:3.")
+    parser.add_argument('--vrp', nargs='*', default=[], metavar='ARCHIVO', help="Instancias CVRPLIB (.vrp).")
+    parser.add_argument('--algorithms', nargs='*', default=list(ALGORITHMS), choices=ALGORITHMS)
+    parser.add_argument('--seeds', nargs='*', type=int, default=[0], help="Semillas de GA y H-ACO.")
+    parser.add_argument('--cws', nargs='*', metavar='NOMBRE=VALOR', help="Parámetros de CWS.")
+    parser.add_argument('--ga', nargs='*', metavar='NOMBRE=VALOR', help="Parámetros del GA.")
+    parser.add_argument('--haco', nargs='*', metavar='NOMBRE=VALOR', help="Parámetros de H-ACO.")
+    parser.add_argument('--time-limit', type=float, help="Límite de tiempo por corrida (seg).")
+    parser.add_argument('--stagnation-limit', type=int, help="Iteraciones sin mejora antes de parar.")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos (por defecto, todos los núcleos).")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='csv')
+    parser.add_argument('--output', help="Archivo de salida (por defecto, la salida estándar).")
+    parser.add_argument('--no-routes', action='store_true', help="No incluir las rutas en la salida.")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenarios
+    if scenarios is None:
+        scenarios = [] if (args.synthetic or args.vrp) else list(get_simulation_scenarios())
+    try:
+        specs = parse_instance_specs(scenarios, args.synthetic, args.vrp)
+        stopping = {'time_limit': args.time_limit, 'stagnation_limit': args.stagnation_limit}
+        stopping = {name: value for name, value in stopping.items() if value is not None}
+        params = {
+            'CWS': parse_params(args.cws),
+            'GA': {**DEFAULT_PARAMS['GA'], **stopping, **parse_params(args.ga)},
+            'H-ACO': {**DEFAULT_PARAMS['H-ACO'], **stopping, **parse_params(args.haco)}
+        }
+    except ValueError as e:
+        parser.error(str(e))
+
+    jobs = build_jobs(specs, args.algorithms, args.seeds)
+    stream = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = ResultWriter(stream, args.format, with_routes=not args.no_routes)
+        for done, row in enumerate(iter_batch(specs, jobs, params, args.workers), start=1):
+            writer.write(row)
+            print(f"[{done}/{len(jobs)}] {row['scenario']} {row['algorithm']} seed={row['seed']} "
+                  f"costo={row['cost']:,.2f} ({row['time']:.2f} s)", file=sys.stderr)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return 0
+
+# ==============================================================================
+# Procesos trabajadores
+# ==============================================================================
+
+_worker_specs = None     # {nombre: spec} de las instancias
+_worker_instances = {}   # Instancias ya construidas en este proceso
+
+def _init_batch_worker(specs):
+    global _worker_specs
+    _worker_specs = specs
+    _worker_instances.clear()
+
+def _run_batch_job(name, algorithm, params, seed):
+    problem = _worker_instances.get(name)
+    if problem is None:
+        problem = _worker_instances[name] = build_instance(_worker_specs[name])
+    solution, cost, exec_time, run_stats = run_algorithm(problem, algorithm, params, seed)
+    # IDs de cliente (no índices de matriz), como en los datos de entrada
+    routes = [[problem['idx_to_id'][node] for node in route] for route in solution]
+    return {
+        'scenario': name, 'algorithm': algorithm, 'seed': seed, 'cost': float(cost), 'time': exec_time,
+        'time_to_best': run_stats.get('time_to_best', exec_time), 'stop_reason': run_stats.get('stop_reason'),
+        'iterations': run_stats.get('iterations'), 'n_routes': len(routes), 'routes': routes
+    }
+
+if __name__ == '__main__':
+    sys.exit(main())
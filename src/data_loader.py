@@ -1,6 +1,11 @@
+import hashlib
+import os
+from pathlib import Path
 import pandas as pd
 import numpy as np
-from src.utils import get_haversine_distance
+from src.utils import get_haversine_matrix, get_candidate_lists, build_candidate_lists
+from src.distance import CondensedDistanceMatrix, MappedDistanceMatrix, build_haversine_distances, \
+    build_euclidean_distances, store_distance_matrix
 
 # Constantes extraídas del documento
 VEHICLE_CAPACITY = 150
@@ -61,52 +66,459 @@ def get_simulation_scenarios():
     }
     return scenarios
 
-def setup_problem_instance(all_customers_df, customer_ids_to_visit):
+# ==============================================================================
+# Proveedores de distancias
+# ==============================================================================
+
+# ID con el que el depósito aparece en las matrices de distancias externas
+DEPOT_ID = 0
+
+class HaversineDistances:
+    """Proveedor por defecto: distancia en línea recta (Haversine) entre coordenadas."""
+
+    def get_matrix(self, ids, coords):
+        return get_haversine_matrix(coords[:, 0], coords[:, 1])
+
+class MatrixFileDistances:
+    """
+    Proveedor de una matriz precalculada (p. ej. distancias por carretera calculadas
+    offline), indexada por ID de cliente; el depósito tiene el ID DEPOT_ID (0).
+    Formatos:
+    - .npz con los arrays 'ids' (M,) y 'matrix' (M, M), fila = origen.
+    - .csv cuadrado con los IDs como primera columna y como encabezado.
+    La matriz puede ser asimétrica. El archivo se lee la primera vez que se usa.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._ids = None
+        self._matrix = None
+
+    def _load(self):
+        if self._matrix is None:
+            if self.path.suffix == '.npz':
+                with np.load(self.path) as data:
+                    ids, matrix = data['ids'], data['matrix']
+            else:
+                frame = pd.read_csv(self.path, index_col=0)
+                frame.columns = frame.columns.astype(frame.index.dtype)
+                ids = frame.index.to_numpy()
+                matrix = frame.loc[ids, ids].to_numpy(dtype=float)
+            if matrix.shape != (len(ids), len(ids)):
+                raise ValueError(f"La matriz de {self.path} no es cuadrada o no coincide con sus IDs")
+            self._ids = {cid: i for i, cid in enumerate(ids.tolist())}
+            self._matrix = np.asarray(matrix, dtype=float)
+        return self._ids, self._matrix
+
+    def __getstate__(self):
+        # Al enviarse a otro proceso (va en el dict del problema) solo viaja la ruta
+        return {'path': self.path, '_ids': None, '_matrix': None}
+
+    def get_matrix(self, ids, coords):
+        """Submatriz de los IDs pedidos (en ese orden)."""
+        index, matrix = self._load()
+        try:
+            positions = np.array([index[cid] for cid in ids])
+        except KeyError as e:
+            raise KeyError(f"El ID {e.args[0]} no está en la matriz de distancias {self.path}") from None
+        return matrix[np.ix_(positions, positions)]
+
+def is_symmetric(dist_matrix, chunk_size=1024):
+    """True si dist[i, j] == dist[j, i] (con tolerancia); se comprueba por bloques de filas."""
+    if isinstance(dist_matrix, CondensedDistanceMatrix):
+        return True # Simétrica por construcción
+    n = dist_matrix.shape[0]
+    for start in range(0, n, chunk_size):
+        rows = slice(start, min(start + chunk_size, n))
+        if not np.allclose(dist_matrix[rows], np.asarray(dist_matrix[:, rows]).T):
+            return False
+    return True
+
+# ==============================================================================
+# Caché en disco de datos derivados
+# ==============================================================================
+
+def matrix_digest(dist_matrix):
+    """Hash del contenido de la matriz de distancias (identifica sus datos derivados)."""
+    data = getattr(dist_matrix, 'values', None) # Almacenamiento condensado
+    if data is None:
+        data = np.asarray(dist_matrix)
+    data = np.ascontiguousarray(data)
+    digest = hashlib.sha256()
+    digest.update(f"{type(dist_matrix).__name__}{data.dtype}{data.shape}".encode())
+    digest.update(memoryview(data).cast('B'))
+    return digest.hexdigest()
+
+class DerivedDataCache:
+    """
+    Caché en disco de arrays derivados de una matriz de distancias (listas de
+    candidatos, matriz heurística...). Cada archivo lleva el hash del contenido de
+    la matriz, así que solo se recalculan cuando cambian los datos de entrada.
+    """
+
+    def __init__(self, cache_dir, digest):
+        self.cache_dir = Path(cache_dir)
+        self.digest = digest
+
+    def path(self, name):
+        return self.cache_dir / f"{name}-{self.digest[:20]}.npy"
+
+    def get(self, name, compute, mmap=False):
+        """Lee 'name' de la caché o lo calcula con compute() y lo guarda."""
+        path = self.path(name)
+        if not path.exists():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            array = compute()
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp.npy')
+            np.save(tmp_path, array)
+            os.replace(tmp_path, path) # Escritura atómica (varios procesos)
+            if not mmap:
+                return array
+        return np.load(path, mmap_mode='r' if mmap else None)
+
+# ==============================================================================
+# Instancias del caso de estudio
+# ==============================================================================
+
+def build_master_instance(all_customers_df, distance_provider=None):
+    """
+    Construye la instancia maestra (Depósito + TODOS los clientes) una sola vez.
+    Todas las simulaciones son subconjuntos de estos clientes, por lo que sus
+    matrices se obtienen por indexación (fancy indexing) de esta matriz maestra.
+    La posición 0 es SIEMPRE el depósito; la posición k+1 es el k-ésimo cliente.
+    Las distancias las da 'distance_provider' (por defecto, HaversineDistances).
+    """
+    customer_ids = all_customers_df.index.to_numpy()
+
+    lats = np.concatenate(([DEPOT_COORDS[0]], all_customers_df['lat'].to_numpy(dtype=float)))
+    lons = np.concatenate(([DEPOT_COORDS[1]], all_customers_df['lon'].to_numpy(dtype=float)))
+    demands = np.concatenate(([0.0], all_customers_df['demand'].to_numpy(dtype=float)))
+    coords = np.column_stack((lats, lons))
+    provider = distance_provider if distance_provider is not None else HaversineDistances()
+
+    master = {
+        'customer_ids': customer_ids,
+        'id_to_pos': {cid: i+1 for i, cid in enumerate(customer_ids)},
+        'coords': coords,
+        'demands': demands,
+        'dist_matrix': provider.get_matrix([DEPOT_ID] + customer_ids.tolist(), coords),
+        'distance_provider': distance_provider # None = Haversine
+    }
+    return master
+
+# Cache de la última instancia maestra construida (una por DataFrame de clientes y proveedor)
+_master_cache = {'df': None, 'provider': None, 'master': None}
+
+def get_master_instance(all_customers_df, distance_provider=None):
+    """Devuelve la instancia maestra del DataFrame, construyéndola solo la primera vez."""
+    if _master_cache['df'] is not all_customers_df or _master_cache['provider'] is not distance_provider:
+        _master_cache['master'] = build_master_instance(all_customers_df, distance_provider)
+        _master_cache['df'] = all_customers_df
+        _master_cache['provider'] = distance_provider
+    return _master_cache['master']
+
+def setup_problem_instance(all_customers_df, customer_ids_to_visit, master=None, n_candidates=None,
+                           dist_storage='dense', dist_path=None, distance_provider=None, cache_dir=None):
     """
     Prepara la instancia del problema para una simulación específica.
-    Crea la matriz de distancias y el vector de demandas.
+    La matriz de distancias, las demandas y las coordenadas se extraen de la
+    instancia maestra (ver build_master_instance) sin recalcular distancias.
+    'n_candidates' fija el tamaño de las listas de vecinos más cercanos.
+    'dist_storage' / 'dist_path' eligen cómo se guarda la matriz (ver build_problem).
+    'distance_provider' reemplaza Haversine (p. ej. MatrixFileDistances con
+    distancias por carretera) y 'cache_dir' guarda en disco sus datos derivados.
     """
+    if master is None:
+        master = get_master_instance(all_customers_df, distance_provider)
+    
+    # Posiciones en la instancia maestra (el depósito es la posición 0)
+    customer_ids_to_visit = list(customer_ids_to_visit)
+    try:
+        positions = np.array([0] + [master['id_to_pos'][cid] for cid in customer_ids_to_visit])
+    except KeyError as e:
+        raise KeyError(f"Cliente {e.args[0]} no existe en los datos de clientes") from None
     
-    # Filtrar clientes para esta simulación
-    instance_customers = all_customers_df.loc[customer_ids_to_visit].copy()
+    problem = build_problem(
+        coords=master['coords'][positions],
+        demands=master['demands'][positions],
+        capacity=VEHICLE_CAPACITY,
+        dist_matrix=master['dist_matrix'][np.ix_(positions, positions)],
+        customer_ids=customer_ids_to_visit,
+        n_candidates=n_candidates,
+        dist_storage=dist_storage,
+        dist_path=dist_path,
+        cache_dir=cache_dir
+    )
+    # Proveedor de las distancias (None = Haversine), para update_problem_instance
+    if 'distance_provider' in master:
+        problem['distance_provider'] = master['distance_provider']
+    return problem
+
+def build_problem(coords, demands, capacity, dist_matrix=None, customer_ids=None,
+                  n_candidates=None, coord_system='latlon', dist_storage='dense', dist_path=None,
+                  cache_dir=None):
+    """
+    Arma el dict del problema (el formato que usan todos los algoritmos) a partir de
+    arrays donde el índice 0 es el depósito y 1..N son los clientes.
+    Si no se da 'dist_matrix' se calcula con Haversine (coordenadas Lat, Lon).
+    'coord_system' es 'latlon' o 'euclidean' (coordenadas X, Y de archivos CVRPLIB).
+    'dist_storage' es uno de src.distance.DIST_STORAGES ('dense', 'float32',
+    'condensed' o 'memmap'; este último guarda la matriz en el .npy 'dist_path').
+    Con 'cache_dir', los datos derivados de la matriz (listas de candidatos, heurística
+    de H-ACO) se guardan en disco con el hash de su contenido (DerivedDataCache).
+    """
+    coords = np.ascontiguousarray(coords, dtype=float)
+    num_nodes = len(coords) # Incluye el depósito
+    if dist_matrix is None:
+        dist_matrix = build_haversine_distances(coords, dist_storage, dist_path)
+    elif dist_storage != 'dense':
+        dist_matrix = store_distance_matrix(dist_matrix, dist_storage, dist_path)
     
-    # Mapeo de ID de cliente (1-30) a índice de matriz (1-N)
+    # Mapeo de ID de cliente a índice de matriz (1-N)
     # El Depósito (ID 0) es SIEMPRE el índice 0
-    id_to_matrix_idx = {cid: i+1 for i, cid in enumerate(instance_customers.index)}
-    matrix_idx_to_id = {i+1: cid for i, cid in enumerate(instance_customers.index)}
-    
-    # Coordenadas (el Depósito es el índice 0)
-    coords = {0: DEPOT_COORDS}
-    for cid, i in id_to_matrix_idx.items():
-        coords[i] = (instance_customers.loc[cid, 'lat'], instance_customers.loc[cid, 'lon'])
-    
-    num_nodes = len(instance_customers) + 1 # +1 por el depósito
-    
-    # Crear vector de demandas (el depósito tiene demanda 0)
-    demands = np.zeros(num_nodes)
-    for cid, i in id_to_matrix_idx.items():
-        demands[i] = instance_customers.loc[cid, 'demand']
-
-    # Crear matriz de distancias (costo)
-    dist_matrix = np.zeros((num_nodes, num_nodes))
-    
-    for i in range(num_nodes):
-        for j in range(i + 1, num_nodes):
-            dist = get_haversine_distance(
-                coords[i][0], coords[i][1],
-                coords[j][0], coords[j][1]
-            )
-            dist_matrix[i, j] = dist
-            dist_matrix[j, i] = dist
-            
+    if customer_ids is None:
+        customer_ids = range(1, num_nodes)
+    id_to_matrix_idx = {cid: i for i, cid in enumerate(customer_ids, start=1)}
+    matrix_idx_to_id = {i: cid for cid, i in id_to_matrix_idx.items()}
+    
     problem = {
         'num_nodes': num_nodes,
-        'demands': demands,
+        'demands': np.asarray(demands, dtype=float),
         'dist_matrix': dist_matrix,
-        'capacity': VEHICLE_CAPACITY,
-        'coords': coords, # Coordenadas (Lat, Lon) por índice de matriz
+        'capacity': capacity,
+        'coords': coords, # Coordenadas por índice de matriz, shape (N, 2)
+        'coord_system': coord_system,
         'id_to_idx': id_to_matrix_idx,
         'idx_to_id': matrix_idx_to_id,
-        'customer_nodes': list(range(1, num_nodes)) # Índices de clientes (excl. depósito)
+        'customer_nodes': list(range(1, num_nodes)), # Índices de clientes (excl. depósito)
+        'symmetric': is_symmetric(dist_matrix) # False: dist[i, j] != dist[j, i] (p. ej. carreteras)
     }
+    if cache_dir is not None:
+        problem['derived_cache'] = DerivedDataCache(cache_dir, matrix_digest(dist_matrix))
+    # Listas de k vecinos más cercanos (problem['candidate_lists'])
+    get_candidate_lists(problem, n_candidates)
+    return problem
+
+def update_problem_instance(problem, all_customers_df, added_ids=(), removed_ids=(), master=None):
+    """
+    Actualiza en sitio una instancia de setup_problem_instance cuando cambian unos
+    pocos clientes: quita 'removed_ids' y agrega 'added_ids' (sus datos y distancias
+    salen de la instancia maestra) sin reconstruir el resto.
+    - Los nodos que quedan conservan su orden y sus distancias; los nuevos van al final.
+    - Solo se recalculan las listas de candidatos de los nodos nuevos y de los que
+      perdieron un candidato o tienen un nodo nuevo más cerca que su k-ésimo vecino.
+    Sin 'master', las distancias de los clientes nuevos salen del mismo proveedor
+    con que se construyó la instancia (problem['distance_provider']).
+    Devuelve old_to_new: índice nuevo de cada índice anterior (-1 si se quitó).
+    """
+    id_to_idx = problem['id_to_idx']
+    removed_ids, added_ids = list(removed_ids), list(added_ids)
+    for cid in removed_ids:
+        if cid not in id_to_idx:
+            raise KeyError(f"Cliente {cid} no está en la instancia")
+    for cid in added_ids:
+        if cid in id_to_idx:
+            raise ValueError(f"Cliente {cid} ya está en la instancia")
+    old_dist = problem['dist_matrix']
+    if isinstance(old_dist, MappedDistanceMatrix):
+        raise ValueError("No se puede actualizar en sitio una matriz 'memmap'; usa setup_problem_instance")
+    
+    n_old = problem['num_nodes']
+    removed = np.array([id_to_idx[cid] for cid in removed_ids], dtype=np.intp)
+    keep = np.setdiff1d(np.arange(n_old), removed)
+    old_to_new = np.full(n_old, -1, dtype=np.intp)
+    old_to_new[keep] = np.arange(len(keep))
+    n_kept, n = len(keep), len(keep) + len(added_ids)
+    
+    # Bloque de los nodos que quedan (sin recalcular) + filas/columnas de los nuevos
+    dist = np.empty((n, n), dtype=old_dist.dtype)
+    dist[:n_kept, :n_kept] = np.asarray(old_dist)[np.ix_(keep, keep)]
+    coords, demands = problem['coords'][keep], problem['demands'][keep]
+    if added_ids:
+        if master is None:
+            # Mismas distancias que la instancia original: nunca Haversine por omisión
+            if 'distance_provider' not in problem:
+                raise ValueError("La instancia no viene de setup_problem_instance: pasa 'master' "
+                                 "(build_master_instance con su proveedor de distancias)")
+            master = get_master_instance(all_customers_df, problem['distance_provider'])
+        try:
+            new_pos = np.array([master['id_to_pos'][cid] for cid in added_ids])
+            kept_pos = np.array([0] + [master['id_to_pos'][problem['idx_to_id'][i]] for i in keep[1:].tolist()])
+        except KeyError as e:
+            raise KeyError(f"Cliente {e.args[0]} no existe en los datos de clientes") from None
+        all_pos = np.concatenate((kept_pos, new_pos))
+        dist[n_kept:, :] = master['dist_matrix'][np.ix_(new_pos, all_pos)]
+        dist[:n_kept, n_kept:] = master['dist_matrix'][np.ix_(kept_pos, new_pos)]
+        coords = np.concatenate((coords, master['coords'][new_pos]))
+        demands = np.concatenate((demands, master['demands'][new_pos]))
+    
+    customer_ids = [problem['idx_to_id'][i] for i in keep[1:].tolist()] + added_ids
+    id_to_matrix_idx = {cid: i for i, cid in enumerate(customer_ids, start=1)}
+    symmetric = problem.get('symmetric', True)
+    if symmetric and added_ids:
+        symmetric = np.allclose(dist[n_kept:, :], dist[:, n_kept:].T)
+    elif not symmetric:
+        symmetric = is_symmetric(dist)
+    candidates = _patch_candidate_lists(problem['candidate_lists'], dist, old_to_new, keep)
+    if isinstance(old_dist, CondensedDistanceMatrix):
+        dist = CondensedDistanceMatrix.from_dense(dist, dist.dtype)
+    
+    problem.update({
+        'num_nodes': n,
+        'demands': np.asarray(demands, dtype=float),
+        'dist_matrix': dist,
+        'coords': np.ascontiguousarray(coords, dtype=float),
+        'id_to_idx': id_to_matrix_idx,
+        'idx_to_id': {i: cid for cid, i in id_to_matrix_idx.items()},
+        'customer_nodes': list(range(1, n)),
+        'symmetric': symmetric,
+        'candidate_lists': candidates
+    })
+    if problem.get('derived_cache') is not None:
+        problem['derived_cache'] = DerivedDataCache(problem['derived_cache'].cache_dir, matrix_digest(dist))
+    return old_to_new
+
+def _patch_candidate_lists(old_candidates, dist, old_to_new, keep):
+    """Listas de candidatos de la instancia actualizada (ver update_problem_instance)."""
+    n, n_kept = dist.shape[0], len(keep)
+    k = min(old_candidates.shape[1], n - 1)
+    if k != old_candidates.shape[1]:
+        return build_candidate_lists(dist, k)
+    
+    candidates = np.empty((n, k), dtype=np.intp)
+    candidates[:n_kept] = old_to_new[np.asarray(old_candidates)[keep]]
+    stale = (candidates[:n_kept] < 0).any(axis=1) # Perdieron un candidato
+    if n > n_kept:
+        # Algún nodo nuevo más cerca que el k-ésimo candidato actual
+        kth = dist[np.arange(n_kept), candidates[:n_kept, -1]]
+        stale |= (dist[:n_kept, n_kept:] < kth[:, None]).any(axis=1)
+    rows = np.concatenate((np.flatnonzero(stale), np.arange(n_kept, n)))
+    if rows.size:
+        candidates[rows] = build_candidate_lists(dist, k, rows=rows)
+    return candidates
+
+# ==============================================================================
+# Instancias sintéticas
+# ==============================================================================
+
+# Rectángulo (Lat, Lon) aproximado de Colombia para ubicar clientes sintéticos
+COLOMBIA_BBOX = ((1.0, 11.5), (-77.5, -72.0))
+INSTANCE_KINDS = ('random', 'clustered', 'mixed')
+
+def generate_instance(n_customers, kind='random', seed=None, capacity=VEHICLE_CAPACITY,
+                      demand_range=(5, 60), n_clusters=None, cluster_spread=0.35,
+                      depot_coords=DEPOT_COORDS, bbox=COLOMBIA_BBOX, n_candidates=None,
+                      dist_storage='dense', dist_path=None):
+    """
+    Genera una instancia CVRP sintética reproducible (misma semilla = misma instancia)
+    en el mismo formato que setup_problem_instance.
+    - 'random': clientes uniformes en el rectángulo 'bbox'.
+    - 'clustered': clientes alrededor de 'n_clusters' centros (desviación 'cluster_spread' grados).
+    - 'mixed': mitad aleatorios, mitad agrupados.
+    Las demandas son enteras, uniformes en 'demand_range' (acotadas por la capacidad).
+    """
+    if kind not in INSTANCE_KINDS:
+        raise ValueError(f"Tipo de instancia desconocido: {kind} (opciones: {INSTANCE_KINDS})")
+    rng = np.random.default_rng(seed)
+    (lat_min, lat_max), (lon_min, lon_max) = bbox
+    
+    n_clustered = {'random': 0, 'clustered': n_customers, 'mixed': n_customers // 2}[kind]
+    n_random = n_customers - n_clustered
+    
+    random_pts = np.column_stack((rng.uniform(lat_min, lat_max, n_random),
+                                  rng.uniform(lon_min, lon_max, n_random)))
+    
+    if n_clusters is None:
+        n_clusters = max(2, n_clustered // 25)
+    centers = np.column_stack((rng.uniform(lat_min, lat_max, n_clusters),
+                               rng.uniform(lon_min, lon_max, n_clusters)))
+    clustered_pts = centers[rng.integers(0, n_clusters, n_clustered)] + \
+                    rng.normal(0.0, cluster_spread, (n_clustered, 2))
+    clustered_pts[:, 0] = np.clip(clustered_pts[:, 0], lat_min, lat_max)
+    clustered_pts[:, 1] = np.clip(clustered_pts[:, 1], lon_min, lon_max)
+    
+    customers = np.vstack((random_pts, clustered_pts))
+    customers = customers[rng.permutation(n_customers)]
+    coords = np.vstack(([depot_coords], customers))
+    
+    low, high = demand_range
+    demands = np.concatenate(([0.0], rng.integers(low, min(high, capacity) + 1, n_customers)))
+    
+    return build_problem(coords, demands, capacity, n_candidates=n_candidates,
+                         dist_storage=dist_storage, dist_path=dist_path)
+
+# ==============================================================================
+# Instancias CVRPLIB (.vrp)
+# ==============================================================================
+
+def load_vrp_file(source, round_distances=True, n_candidates=None, dist_storage='dense', dist_path=None):
+    """
+    Lee una instancia CVRPLIB (.vrp, p.ej. el conjunto X de Uchoa et al.) línea a
+    línea, volcando coordenadas y demandas directamente en arrays de NumPy.
+    'source' es una ruta o un archivo abierto (texto o binario).
+    Soporta EDGE_WEIGHT_TYPE EUC_2D; con 'round_distances' las distancias se
+    redondean al entero más cercano, como en la convención de CVRPLIB.
+    Los IDs de cliente del problema son los números de nodo del archivo.
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        with open(source, 'rb') as f:
+            return load_vrp_file(f, round_distances, n_candidates, dist_storage, dist_path)
+    
+    header = {}
+    coords = demands = None
+    depot_ids = []
+    section = None
+    
+    for raw_line in source:
+        line = raw_line.decode() if isinstance(raw_line, bytes) else raw_line
+        line = line.strip()
+        if not line:
+            continue
+        key = line.split(':')[0].strip().upper()
+        
+        if key.endswith('_SECTION'):
+            section = key
+            if section in ('NODE_COORD_SECTION', 'DEMAND_SECTION') and coords is None:
+                dimension = int(header['DIMENSION'])
+                coords = np.zeros((dimension, 2))
+                demands = np.zeros(dimension)
+            continue
+        if key == 'EOF':
+            break
+        
+        if section is None:
+            name, _, value = line.partition(':')
+            header[name.strip().upper()] = value.strip()
+        elif section == 'NODE_COORD_SECTION':
+            node, x, y = line.split()[:3]
+            coords[int(node) - 1] = (float(x), float(y))
+        elif section == 'DEMAND_SECTION':
+            node, demand = line.split()[:2]
+            demands[int(node) - 1] = float(demand)
+        elif section == 'DEPOT_SECTION':
+            node = int(line.split()[0])
+            if node == -1:
+                section = None
+            else:
+                depot_ids.append(node)
+    
+    edge_type = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+    if edge_type != 'EUC_2D':
+        raise ValueError(f"EDGE_WEIGHT_TYPE no soportado: {edge_type}")
+    if coords is None or 'CAPACITY' not in header:
+        raise ValueError("Archivo .vrp incompleto (faltan CAPACITY o NODE_COORD_SECTION)")
+    
+    # El depósito pasa al índice 0; el resto conserva el orden del archivo
+    depot = (depot_ids[0] if depot_ids else 1) - 1
+    order = np.concatenate(([depot], np.delete(np.arange(len(coords)), depot)))
+    coords, demands = coords[order], demands[order]
+    demands[0] = 0.0
+    
+    # Por bloques de filas, directamente en el almacenamiento pedido
+    dist_matrix = build_euclidean_distances(coords, dist_storage, dist_path, round_distances=round_distances)
+    
+    problem = build_problem(coords, demands, float(header['CAPACITY']), dist_matrix=dist_matrix,
+                            customer_ids=(order[1:] + 1).tolist(), n_candidates=n_candidates,
+                            coord_system='euclidean', dist_storage=dist_storage, dist_path=dist_path)
+    problem['name'] = header.get('NAME')
     return problem
@@ -0,0 +1,195 @@
+import numpy as np
+from src.utils import get_haversine_rows
+
+# Modos de almacenamiento de la matriz de distancias:
+# - 'dense': float64 (N, N), el formato original.
+# - 'float32': (N, N) en precisión simple (mitad de memoria).
+# - 'condensed': solo el triángulo superior (N(N-1)/2 valores), matriz simétrica.
+# - 'memmap': archivo .npy en disco, mapeado en memoria bajo demanda.
+DIST_STORAGES = ('dense', 'float32', 'condensed', 'memmap')
+
+# Filas por bloque al calcular matrices grandes (limita la memoria temporal)
+ROW_CHUNK = 512
+
+class CondensedDistanceMatrix:
+    """
+    Matriz de distancias simétrica guardada como su triángulo superior (sin la diagonal),
+    con la misma indexación que un array (N, N): dist[i, j] (escalares o arrays con
+    broadcasting), dist[i] / dist[filas] (filas completas) y np.asarray(dist) (densa).
+    """
+
+    def __init__(self, values, n):
+        self.values = values
+        self.n = n
+        self.shape = (n, n)
+        self.ndim = 2
+        self.dtype = values.dtype
+
+    @classmethod
+    def from_dense(cls, dist_matrix, dtype=np.float64):
+        dist_matrix = np.asarray(dist_matrix)
+        n = dist_matrix.shape[0]
+        if not np.allclose(dist_matrix, dist_matrix.T):
+            raise ValueError("El almacenamiento 'condensed' requiere una matriz simétrica")
+        i, j = np.triu_indices(n, k=1)
+        return cls(dist_matrix[i, j].astype(dtype), n)
+
+    def __len__(self):
+        return self.n
+
+    def _offsets(self, i, j):
+        """Posición de (i, j), i < j, en el triángulo condensado."""
+        return self.n * i - i * (i + 1) // 2 + (j - i - 1)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            i, j = key
+            # Camino rápido: dos enteros de Python (bucles de la VNS)
+            if type(i) is int and type(j) is int:
+                if i == j:
+                    return self.dtype.type(0)
+                if i > j:
+                    i, j = j, i
+                return self.values[self.n * i - i * (i + 1) // 2 + (j - i - 1)]
+            i, j = np.broadcast_arrays(np.asarray(i, dtype=np.intp), np.asarray(j, dtype=np.intp))
+            lo, hi = np.minimum(i, j), np.maximum(i, j)
+            off_diagonal = lo != hi
+            out = np.zeros(lo.shape, dtype=self.dtype)
+            out[off_diagonal] = self.values[self._offsets(lo[off_diagonal], hi[off_diagonal])]
+            return out[()] if out.ndim == 0 else out
+        # Filas completas: cada fila es la columna r del triángulo (j < r) más un tramo contiguo (j > r)
+        rows = np.arange(self.n)[key]
+        out = np.empty(rows.shape + (self.n,), dtype=self.dtype)
+        flat = out.reshape(-1, self.n)
+        below = np.arange(self.n)
+        for row, r in zip(flat, rows.ravel().tolist()):
+            j = below[:r]
+            row[:r] = self.values[self._offsets(j, r)]
+            row[r] = 0
+            start = self._offsets(r, r + 1)
+            row[r + 1:] = self.values[start:start + self.n - r - 1]
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self[np.arange(self.n)]
+        return dense if dtype is None else dense.astype(dtype)
+
+class MappedDistanceMatrix:
+    """
+    Matriz de distancias en un archivo .npy, abierta con np.memmap la primera vez que se
+    usa (las páginas se leen del disco bajo demanda). Al enviarse a otro proceso solo
+    viaja la ruta del archivo, no los datos.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._array = None
+
+    @property
+    def array(self):
+        if self._array is None:
+            self._array = np.load(self.path, mmap_mode='r')
+        return self._array
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    @property
+    def dtype(self):
+        return self.array.dtype
+
+    ndim = 2
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        return self.array[key]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.array, dtype=dtype)
+
+    def __getstate__(self):
+        return {'path': self.path, '_array': None}
+
+def _storage_dtype(storage, dtype):
+    if storage not in DIST_STORAGES:
+        raise ValueError(f"Almacenamiento de distancias desconocido: {storage} (opciones: {DIST_STORAGES})")
+    if dtype is not None:
+        return np.dtype(dtype)
+    return np.dtype(np.float32 if storage == 'float32' else np.float64)
+
+def _require_path(path):
+    if path is None:
+        raise ValueError("El almacenamiento 'memmap' requiere la ruta del archivo .npy (dist_path)")
+    return path
+
+def store_distance_matrix(dist_matrix, storage='dense', path=None, dtype=None):
+    """
+    Convierte una matriz de distancias densa al modo de almacenamiento 'storage'.
+    'dtype' permite combinar precisión simple con 'condensed' o 'memmap'.
+    Si la matriz ya está guardada en ese modo se devuelve tal cual.
+    """
+    dtype = _storage_dtype(storage, dtype)
+    if storage in ('dense', 'float32'):
+        return np.asarray(dist_matrix, dtype=dtype)
+    if storage == 'condensed':
+        if isinstance(dist_matrix, CondensedDistanceMatrix) and dist_matrix.dtype == dtype:
+            return dist_matrix
+        return CondensedDistanceMatrix.from_dense(dist_matrix, dtype)
+    if isinstance(dist_matrix, MappedDistanceMatrix) and dist_matrix.path == str(path) \
+            and dist_matrix.dtype == dtype:
+        return dist_matrix
+    np.save(_require_path(path), np.asarray(dist_matrix, dtype=dtype))
+    return MappedDistanceMatrix(path)
+
+def build_haversine_distances(coords, storage='dense', path=None, dtype=None):
+    """
+    Matriz de distancias Haversine de 'coords' (Lat, Lon) directamente en el modo
+    'storage', por bloques de filas: nunca se materializa la matriz float64 completa
+    (salvo en el modo 'dense').
+    """
+    lats, lons = coords[:, 0], coords[:, 1]
+    return _build_by_rows(len(coords), lambda rows: get_haversine_rows(lats, lons, rows), storage, path, dtype)
+
+def build_euclidean_distances(coords, storage='dense', path=None, dtype=None, round_distances=False):
+    """
+    Igual que build_haversine_distances, con distancias euclidianas entre coordenadas
+    (X, Y); con 'round_distances' se redondean al entero más cercano (CVRPLIB).
+    """
+    xs, ys = coords[:, 0], coords[:, 1]
+
+    def rows_block(rows):
+        block = np.hypot(xs[rows, None] - xs[None, :], ys[rows, None] - ys[None, :])
+        return np.rint(block, out=block) if round_distances else block
+
+    return _build_by_rows(len(coords), rows_block, storage, path, dtype)
+
+def _build_by_rows(n, rows_block, storage, path, dtype):
+    """Matriz (n, n) en el modo 'storage', llenada con rows_block(filas) por bloques de ROW_CHUNK."""
+    dtype = _storage_dtype(storage, dtype)
+
+    if storage == 'condensed':
+        values = np.empty(n * (n - 1) // 2, dtype=dtype)
+        for start in range(0, n, ROW_CHUNK):
+            rows = np.arange(start, min(start + ROW_CHUNK, n))
+            block = rows_block(rows)
+            for r, row in zip(rows.tolist(), block):
+                offset = n * r - r * (r + 1) // 2
+                values[offset:offset + n - r - 1] = row[r + 1:]
+        return CondensedDistanceMatrix(values, n)
+
+    if storage == 'memmap':
+        out = np.lib.format.open_memmap(_require_path(path), mode='w+', dtype=dtype, shape=(n, n))
+    else:
+        out = np.empty((n, n), dtype=dtype)
+    for start in range(0, n, ROW_CHUNK):
+        rows = np.arange(start, min(start + ROW_CHUNK, n))
+        out[rows] = rows_block(rows)
+
+    if storage == 'memmap':
+        out.flush()
+        del out
+        return MappedDistanceMatrix(path)
+    return out
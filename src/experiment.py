@@ -0,0 +1,125 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from src.algorithms.cws import run_cws
+from src.algorithms.ga import GeneticAlgorithm
+from src.algorithms.h_aco import HybridACO
+
+# Algoritmos disponibles para el experimento
+ALGORITHMS = ('CWS', 'GA', 'H-ACO')
+
+# Algoritmos deterministas: basta una corrida, que se replica para las N corridas
+DETERMINISTIC_ALGORITHMS = {'CWS'}
+
+def get_run_seed(base_seed, algorithm, run):
+    """
+    Semilla determinista de una corrida: depende solo de (semilla base, algoritmo, corrida),
+    no del orden en que los procesos terminen.
+    """
+    alg_idx = ALGORITHMS.index(algorithm)
+    return int(np.random.SeedSequence([base_seed, alg_idx, run]).generate_state(1)[0])
+
+def run_algorithm(problem, algorithm, params=None, seed=None):
+    """
+    Ejecuta un algoritmo sobre el problema.
+    Devuelve (solución, costo, tiempo en segundos, estadísticas de la corrida).
+    Las estadísticas (time-to-best, motivo de parada...) son {} para CWS, cuyos
+    'params' son los de run_cws (p. ej. local_search).
+    """
+    params = params or {}
+    start_time = time.time()
+
+    if algorithm == 'CWS':
+        solution, cost = run_cws(problem, **params)
+        run_stats = {}
+    elif algorithm in ('GA', 'H-ACO'):
+        solver_class = GeneticAlgorithm if algorithm == 'GA' else HybridACO
+        solver = solver_class(problem, seed=seed, **params)
+        solution, cost = solver.run()
+        run_stats = solver.run_stats
+    else:
+        raise ValueError(f"Algoritmo desconocido: {algorithm}")
+
+    return solution, cost, time.time() - start_time, run_stats
+
+def iter_experiment(problem, algorithms, n_runs, params=None, base_seed=0, n_workers=None, completed=None):
+    """
+    Ejecuta el experimento estadístico (algoritmo x corrida) repartiendo las corridas
+    entre 'n_workers' procesos (por defecto, todos los núcleos; 1 = en este proceso).
+    'params' es un dict {algoritmo: kwargs}. Es un generador: entrega cada resultado
+    en cuanto termina, como dict con Algorithm, Run, Seed, Cost, Time, TimeToBest,
+    StopReason y Routes.
+    'completed' es un conjunto de (algoritmo, corrida) ya hechos que no se repiten
+    (para reanudar un experimento interrumpido, ver iter_stored_experiment).
+    """
+    params = params or {}
+    completed = completed or set()
+    jobs = []
+    missing = {}
+    for algorithm in algorithms:
+        missing[algorithm] = [run for run in range(1, n_runs + 1) if (algorithm, run) not in completed]
+        runs = missing[algorithm][:1] if algorithm in DETERMINISTIC_ALGORITHMS else missing[algorithm]
+        for run in runs:
+            jobs.append((algorithm, run, get_run_seed(base_seed, algorithm, run)))
+
+    def _expand(algorithm, run, seed, result):
+        solution, cost, exec_time, run_stats = result
+        # Las corridas deterministas se replican para todas las corridas pendientes
+        runs = missing[algorithm] if algorithm in DETERMINISTIC_ALGORITHMS else [run]
+        for r in runs:
+            yield {'Algorithm': algorithm, 'Run': r, 'Seed': seed, 'Cost': cost, 'Time': exec_time,
+                   'TimeToBest': run_stats.get('time_to_best', exec_time),
+                   'StopReason': run_stats.get('stop_reason'), 'Routes': solution}
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    if n_workers <= 1:
+        for algorithm, run, seed in jobs:
+            result = run_algorithm(problem, algorithm, params.get(algorithm), seed)
+            yield from _expand(algorithm, run, seed, result)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_experiment_worker,
+                             initargs=(problem,)) as pool:
+        futures = {
+            pool.submit(_run_experiment_job, algorithm, params.get(algorithm), seed): (algorithm, run, seed)
+            for algorithm, run, seed in jobs
+        }
+        for future in as_completed(futures):
+            algorithm, run, seed = futures[future]
+            yield from _expand(algorithm, run, seed, future.result())
+
+def iter_stored_experiment(store, scenario, problem, algorithms, n_runs, params=None, base_seed=0,
+                           n_workers=None):
+    """
+    Igual que iter_experiment, pero guardando cada corrida en 'store' (ExperimentStore)
+    en cuanto termina y ejecutando solo las celdas (algoritmo, corrida) que aún no
+    están guardadas para este escenario, parámetros y semilla base: si el
+    experimento se interrumpe, al relanzarlo se reanuda donde quedó.
+    """
+    params = params or {}
+    completed = store.completed_runs(scenario, algorithms, params, base_seed)
+    for result in iter_experiment(problem, algorithms, n_runs, params, base_seed, n_workers, completed):
+        store.add_result(scenario, params.get(result['Algorithm']), base_seed, result)
+        yield result
+
+def run_experiment(problem, algorithms, n_runs, params=None, base_seed=0, n_workers=None):
+    """Versión bloqueante de iter_experiment: lista de resultados ordenada por (algoritmo, corrida)."""
+    results = list(iter_experiment(problem, algorithms, n_runs, params, base_seed, n_workers))
+    results.sort(key=lambda r: (ALGORITHMS.index(r['Algorithm']), r['Run']))
+    return results
+
+# ==============================================================================
+# Procesos trabajadores
+# ==============================================================================
+
+_worker_problem = None # Instancia del problema (se envía una sola vez por proceso)
+
+def _init_experiment_worker(problem):
+    global _worker_problem
+    _worker_problem = problem
+
+def _run_experiment_job(algorithm, params, seed):
+    return run_algorithm(_worker_problem, algorithm, params, seed)
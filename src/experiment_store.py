@@ -0,0 +1,90 @@
+import json
+import sqlite3
+import time
+from contextlib import closing
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    scenario      TEXT    NOT NULL,
+    algorithm     TEXT    NOT NULL,
+    params        TEXT    NOT NULL,
+    base_seed     INTEGER NOT NULL,
+    run           INTEGER NOT NULL,
+    seed          INTEGER,
+    cost          REAL    NOT NULL,
+    time          REAL    NOT NULL,
+    time_to_best  REAL,
+    stop_reason   TEXT,
+    routes        TEXT    NOT NULL,
+    created_at    REAL    NOT NULL,
+    PRIMARY KEY (scenario, algorithm, params, base_seed, run)
+)
+"""
+
+def params_key(params):
+    """Parámetros de un algoritmo como JSON canónico (claves ordenadas), para compararlos."""
+    return json.dumps(params or {}, sort_keys=True)
+
+class ExperimentStore:
+    """
+    Almacén SQLite de corridas del experimento estadístico: cada corrida terminada se
+    guarda (commit) al momento con su escenario, algoritmo, parámetros, semilla, costo,
+    rutas y tiempos. Cada operación abre su propia conexión, así que se puede usar
+    desde varios hilos (sesiones de Streamlit) y sobrevive a recargas o caídas.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with closing(self._connect()) as conn:
+            conn.execute(_SCHEMA)
+            conn.commit()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def add_result(self, scenario, params, base_seed, result):
+        """Guarda un resultado de iter_experiment (dict con Algorithm, Run, Seed, Cost...)."""
+        row = (
+            scenario, result['Algorithm'], params_key(params), base_seed, result['Run'], result['Seed'],
+            float(result['Cost']), float(result['Time']),
+            None if result.get('TimeToBest') is None else float(result['TimeToBest']),
+            result.get('StopReason'), json.dumps(result['Routes'], default=int), time.time()
+        )
+        with closing(self._connect()) as conn:
+            conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            conn.commit()
+
+    def completed_runs(self, scenario, algorithms, params, base_seed):
+        """Conjunto de (algoritmo, corrida) ya guardados; 'params' es {algoritmo: kwargs}."""
+        completed = set()
+        with closing(self._connect()) as conn:
+            for algorithm in algorithms:
+                cursor = conn.execute(
+                    "SELECT run FROM runs WHERE scenario = ? AND algorithm = ? AND params = ? AND base_seed = ?",
+                    (scenario, algorithm, params_key(params.get(algorithm)), base_seed)
+                )
+                completed.update((algorithm, run) for (run,) in cursor)
+        return completed
+
+    def results(self, scenario, algorithms, params, base_seed, n_runs=None, with_routes=False):
+        """
+        Corridas guardadas (corridas 1..n_runs si se indica) como lista de dicts con las
+        mismas claves que iter_experiment, ordenada por (algoritmo, corrida).
+        """
+        rows = []
+        with closing(self._connect()) as conn:
+            for algorithm in algorithms:
+                query = ("SELECT run, seed, cost, time, time_to_best, stop_reason, routes FROM runs "
+                         "WHERE scenario = ? AND algorithm = ? AND params = ? AND base_seed = ?")
+                args = [scenario, algorithm, params_key(params.get(algorithm)), base_seed]
+                if n_runs is not None:
+                    query += " AND run <= ?"
+                    args.append(n_runs)
+                for run, seed, cost, exec_time, time_to_best, stop_reason, routes in \
+                        conn.execute(query + " ORDER BY run", args):
+                    rows.append({
+                        'Algorithm': algorithm, 'Run': run, 'Seed': seed, 'Cost': cost, 'Time': exec_time,
+                        'TimeToBest': time_to_best, 'StopReason': stop_reason,
+                        'Routes': json.loads(routes) if with_routes else None
+                    })
+        return rows
@@ -0,0 +1,456 @@
+from collections import deque
+import numpy as np
+from src.algorithms.profiling import Profiler
+from src.utils import get_candidate_lists
+
+# Mejora mínima para aceptar un movimiento (evita ciclos por redondeo)
+IMPROVEMENT_EPS = 1e-9
+
+# Registro de vecindarios: nombre -> (función, alcance). Alcance 'route': la función
+# recibe (motor, ruta) y solo se evalúa sobre rutas modificadas; alcance 'node':
+# recibe (motor, nodo) y solo se evalúa sobre nodos activos (don't-look bits).
+# Cada función aplica el primer movimiento que mejora y devuelve True, o False.
+NEIGHBORHOODS = {}
+DEFAULT_NEIGHBORHOODS = ('2opt', 'relocate') # Los de la VNS original de H-ACO
+ALL_NEIGHBORHOODS = ('2opt', 'relocate', 'swap', 'oropt', '2opt*')
+
+# Longitudes de los segmentos que mueve or-opt
+OR_OPT_LENGTHS = (1, 2, 3)
+
+def neighborhood(name, scope='node'):
+    """Decorador que registra un vecindario en NEIGHBORHOODS."""
+    def register(func):
+        NEIGHBORHOODS[name] = (func, scope)
+        return func
+    return register
+
+class LocalSearch:
+    """
+    Motor de búsqueda local (VNS) reutilizable: H-ACO lo aplica a cada hormiga, y
+    post_optimize() lo aplica a las soluciones del GA o de CWS.
+    - Vecindarios enchufables (NEIGHBORHOODS), aplicados en el orden de 'neighborhoods'.
+    - Don't-look bits: solo se evalúan los movimientos de los nodos activos; un nodo
+      se desactiva cuando ningún vecindario lo mejora, y se reactiva cuando cambia su
+      ruta o la de un nodo que lo tiene como candidato.
+    - Rutas sucias: los vecindarios intra-ruta solo recorren las rutas modificadas.
+    - Cada movimiento aplica su delta de costo y de carga (no se recorren las rutas).
+    Todos los vecindarios son granulares (listas de candidatos) y, salvo 2-opt (que
+    corrige el costo del tramo invertido), no invierten tramos: válidos con distancias
+    asimétricas.
+    """
+
+    def __init__(self, problem, neighborhoods=DEFAULT_NEIGHBORHOODS, n_candidates=None, profiler=None):
+        unknown = [name for name in neighborhoods if name not in NEIGHBORHOODS]
+        if unknown:
+            raise ValueError(f"Vecindarios desconocidos: {unknown} (opciones: {list(NEIGHBORHOODS)})")
+        self.problem = problem
+        self.neighborhoods = tuple(neighborhoods)
+        self.dist = problem['dist_matrix']
+        self.demands = np.asarray(problem['demands'], dtype=float).tolist()
+        self.capacity = problem['capacity']
+        self.symmetric = problem.get('symmetric', True)
+        self.candidates = get_candidate_lists(problem, n_candidates).tolist() # Listas Python (acceso escalar)
+        # Granular solo si las listas de candidatos son cortas frente al número de clientes
+        self.granular = 2 * len(self.candidates[0]) < len(problem['customer_nodes'])
+        self.improvement_eps = _improvement_eps(self.dist)
+        self.profiler = profiler or Profiler()
+
+        moves = [(name, *NEIGHBORHOODS[name]) for name in self.neighborhoods]
+        self._route_moves = [(func, 'vns.' + name) for name, func, scope in moves if scope == 'route']
+        self._node_moves = [(func, 'vns.' + name) for name, func, scope in moves if scope == 'node']
+
+    def improve(self, routes):
+        """
+        Aplica la VNS a una solución (lista de rutas, no se modifica).
+        Devuelve (rutas, costo), sin rutas vacías.
+        """
+        self._start([list(route) for route in routes if len(route)])
+        self._search()
+        return [route for route in self.routes if route], self.cost
+
+    # --------------------------------------------------------------------------
+    # Estado de la búsqueda
+    # --------------------------------------------------------------------------
+
+    def _start(self, routes):
+        n_nodes = self.problem['num_nodes']
+        self.routes = routes
+        self.loads = [sum(self.demands[node] for node in route) for route in routes]
+        self.cost = _routes_cost(self.dist, routes) # Costo total; los movimientos suman su delta
+        self.route_of = [-1] * n_nodes      # Ruta de cada nodo (-1 = depósito / fuera)
+        self.pos = [0] * n_nodes            # Posición de cada nodo en su ruta
+        self.prefix_loads = [None] * len(routes) # Cargas acumuladas (2-opt*), por ruta
+        self.dirty = [True] * len(routes)   # Rutas modificadas desde su última revisión
+        self.active = [False] * n_nodes     # Don't-look bits (True = por revisar)
+        self.queue = deque()
+        for r, route in enumerate(routes):
+            self._index(r)
+            for node in route:
+                self.active[node] = True
+                self.queue.append(node)
+
+    def _index(self, r):
+        route = self.routes[r]
+        for p, node in enumerate(route):
+            self.route_of[node] = r
+            self.pos[node] = p
+        self.prefix_loads[r] = None
+
+    def _changed(self, delta, *changed_routes):
+        """
+        Tras un movimiento: suma su 'delta' al costo (las cargas ya las actualizó el
+        movimiento), recalcula las posiciones de las rutas modificadas y reactiva sus
+        nodos y los candidatos de estos (pueden tener nuevas mejoras).
+        """
+        self.cost += float(delta)
+        for r in changed_routes:
+            self._index(r)
+            route = self.routes[r]
+            self.dirty[r] = True
+            for node in route:
+                for neighbor in (node, *self.candidates[node]):
+                    if not self.active[neighbor] and self.route_of[neighbor] >= 0:
+                        self.active[neighbor] = True
+                        self.queue.append(neighbor)
+
+    def _search(self):
+        while True:
+            # 1. Vecindarios intra-ruta sobre las rutas modificadas
+            for r in range(len(self.routes)):
+                if not self.dirty[r]:
+                    continue
+                for move, phase in self._route_moves:
+                    with self.profiler.phase(phase):
+                        while move(self, r):
+                            pass
+                self.dirty[r] = False
+            if not self.queue:
+                return
+
+            # 2. Vecindarios por nodo sobre los nodos activos
+            while self.queue:
+                u = self.queue.popleft()
+                self.active[u] = False
+                for move, phase in self._node_moves:
+                    with self.profiler.phase(phase):
+                        improved = move(self, u)
+                    if improved:
+                        break
+
+    # --------------------------------------------------------------------------
+    # Utilidades para los vecindarios
+    # --------------------------------------------------------------------------
+
+    def neighbors(self, node):
+        """(anterior, siguiente) de 'node' en su ruta (0 = depósito)."""
+        route = self.routes[self.route_of[node]]
+        p = self.pos[node]
+        return (route[p - 1] if p > 0 else 0), (route[p + 1] if p + 1 < len(route) else 0)
+
+    def route_prefix_loads(self, r):
+        """Cargas acumuladas de la ruta r (calculadas solo si cambió desde la última vez)."""
+        if self.prefix_loads[r] is None:
+            prefix = [0.0]
+            for node in self.routes[r]:
+                prefix.append(prefix[-1] + self.demands[node])
+            self.prefix_loads[r] = prefix
+        return self.prefix_loads[r]
+
+    def count(self, phase, evaluated, accepted):
+        """Contadores de movimientos evaluados / aceptados de un vecindario."""
+        if self.profiler.enabled:
+            self.profiler.count(phase + '.evaluated', evaluated)
+            self.profiler.count(phase + '.accepted', accepted)
+
+def post_optimize(problem, routes, neighborhoods=ALL_NEIGHBORHOODS, n_candidates=None, profiler=None):
+    """
+    Pule con la VNS una solución (lista de rutas) de cualquier algoritmo (GA, CWS).
+    neighborhoods=True equivale a ALL_NEIGHBORHOODS. Devuelve (rutas, costo).
+    """
+    if neighborhoods is True:
+        neighborhoods = ALL_NEIGHBORHOODS
+    engine = LocalSearch(problem, neighborhoods, n_candidates, profiler)
+    return engine.improve(routes)
+
+def _routes_cost(dist, routes):
+    """Costo total de las rutas con una sola indexación de la matriz (acumulado en float64)."""
+    path = [0]
+    for route in routes:
+        path.extend(route)
+        path.append(0)
+    path = np.asarray(path, dtype=np.intp)
+    return float(np.asarray(dist[path[:-1], path[1:]], dtype=float).sum())
+
+def _improvement_eps(dist_matrix):
+    """
+    Mejora mínima para aceptar un movimiento de la VNS. Con distancias en precisión
+    simple (float32) el redondeo de un delta puede superar IMPROVEMENT_EPS y un
+    movimiento y su inverso parecerían ambos mejoras; el umbral se escala entonces
+    con el épsilon del tipo y la mayor distancia posible (2 * max d(0, i)).
+    """
+    dtype = np.dtype(dist_matrix.dtype)
+    if dtype.kind != 'f':
+        return IMPROVEMENT_EPS
+    scale = 2 * float(np.max(dist_matrix[0]))
+    return max(IMPROVEMENT_EPS, 16 * float(np.finfo(dtype).eps) * scale)
+
+# ==============================================================================
+# Vecindarios
+# ==============================================================================
+
+@neighborhood('2opt', scope='route')
+def two_opt(ls, r):
+    """
+    2-opt (intra-ruta), granular: invierte el tramo entre dos arcos (a, b) y (c, d)
+    de la ruta (incluyendo los arcos con el depósito). Delta O(1):
+    d(a,c) + d(b,d) - d(a,b) - d(c,d). Con distancias asimétricas se suma además lo
+    que cambia recorrer el tramo b..c al revés (sumas acumuladas en ambos sentidos).
+    """
+    route = ls.routes[r]
+    if len(route) < 2:
+        return False
+    dist = ls.dist
+    path = [0, *route, 0]
+    if not ls.symmetric:
+        forward, backward = _path_prefix_costs(dist, path)
+    evaluated = 0
+
+    for i, j in _2opt_moves(path, ls.candidates):
+        evaluated += 1
+        a, b, c, d = path[i], path[i+1], path[j], path[j+1]
+        delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+        if not ls.symmetric:
+            delta += (backward[j] - backward[i+1]) - (forward[j] - forward[i+1])
+
+        if delta < -ls.improvement_eps:
+            # [..., a, b, ..., c, d, ...] -> [..., a, c, ..., b, d, ...]
+            route[i:j] = route[i:j][::-1]
+            ls._changed(delta, r)
+            ls.count('vns.2opt', evaluated, 1)
+            return True
+    ls.count('vns.2opt', evaluated, 0)
+    return False
+
+@neighborhood('relocate')
+def relocate(ls, u):
+    """
+    Re-inserción (inter-ruta): mueve 'u' (entre 'a' y 'b') a otra ruta, entre 'c' y 'e'.
+    Delta O(1): [d(c,u) + d(u,e) - d(c,e)] - [d(a,u) + d(u,b) - d(a,b)].
+    Granular: solo junto a uno de sus candidatos (el depósito = inicio o final de ruta).
+    """
+    dist, routes = ls.dist, ls.routes
+    r1 = ls.route_of[u]
+    a, b = ls.neighbors(u)
+    removal_gain = dist[a, u] + dist[u, b] - dist[a, b]
+    demand_u = ls.demands[u]
+    evaluated = 0
+
+    for r2, insert_pos in _relocate_moves(ls, u):
+        if r1 == r2:
+            continue
+        evaluated += 1
+        if ls.loads[r2] + demand_u > ls.capacity:
+            continue
+        route2 = routes[r2]
+        prev = route2[insert_pos - 1] if insert_pos > 0 else 0
+        nxt = route2[insert_pos] if insert_pos < len(route2) else 0
+        delta = dist[prev, u] + dist[u, nxt] - dist[prev, nxt] - removal_gain
+        if delta < -ls.improvement_eps:
+            del routes[r1][ls.pos[u]]
+            route2.insert(insert_pos, u)
+            ls.loads[r1] -= demand_u
+            ls.loads[r2] += demand_u
+            ls._changed(delta, r1, r2)
+            ls.count('vns.relocate', evaluated, 1)
+            return True
+    ls.count('vns.relocate', evaluated, 0)
+    return False
+
+@neighborhood('swap')
+def swap(ls, u):
+    """
+    Intercambio (inter-ruta): 'u' cambia de lugar con un vecino 'w' (anterior o
+    siguiente) de uno de sus candidatos 'v', quedando junto a 'v'. Delta O(1).
+    """
+    dist, routes = ls.dist, ls.routes
+    r1 = ls.route_of[u]
+    a, b = ls.neighbors(u)
+    evaluated = 0
+
+    for v in ls.candidates[u]:
+        r2 = ls.route_of[v]
+        if v == 0 or r2 < 0 or r2 == r1:
+            continue
+        for w in ls.neighbors(v):
+            if w == 0:
+                continue
+            evaluated += 1
+            demand_diff = ls.demands[w] - ls.demands[u]
+            if ls.loads[r1] + demand_diff > ls.capacity or ls.loads[r2] - demand_diff > ls.capacity:
+                continue
+            c, e = ls.neighbors(w)
+            delta = dist[a, w] + dist[w, b] - dist[a, u] - dist[u, b] + \
+                    dist[c, u] + dist[u, e] - dist[c, w] - dist[w, e]
+            if delta < -ls.improvement_eps:
+                routes[r1][ls.pos[u]], routes[r2][ls.pos[w]] = w, u
+                ls.loads[r1] += demand_diff
+                ls.loads[r2] -= demand_diff
+                ls._changed(delta, r1, r2)
+                ls.count('vns.swap', evaluated, 1)
+                return True
+    ls.count('vns.swap', evaluated, 0)
+    return False
+
+@neighborhood('oropt')
+def or_opt(ls, u):
+    """
+    Or-opt: mueve el segmento de 1 a 3 clientes que empieza en 'u' (sin invertirlo)
+    justo después de un candidato de 'u', o justo antes de un candidato del último
+    cliente del segmento, en la misma ruta o en otra. Delta O(1).
+    """
+    dist, routes = ls.dist, ls.routes
+    r1, p = ls.route_of[u], ls.pos[u]
+    route1 = routes[r1]
+    a = route1[p - 1] if p > 0 else 0
+    evaluated = 0
+
+    for length in OR_OPT_LENGTHS:
+        if p + length > len(route1):
+            break
+        last = route1[p + length - 1]
+        b = route1[p + length] if p + length < len(route1) else 0
+        removal_gain = dist[a, u] + dist[last, b] - dist[a, b]
+        segment_load = sum(ls.demands[node] for node in route1[p:p + length])
+
+        # Destinos: (c, d) = (v, siguiente de v) o (anterior de v, v)
+        for v, after in [(v, True) for v in ls.candidates[u]] + [(v, False) for v in ls.candidates[last]]:
+            r2 = ls.route_of[v]
+            if v == 0 or r2 < 0 or (r2 == r1 and p <= ls.pos[v] < p + length):
+                continue
+            prev_v, next_v = ls.neighbors(v)
+            c, d = (v, next_v) if after else (prev_v, v)
+            if r2 == r1 and (c == last or d == u):
+                continue # El segmento ya está ahí
+            evaluated += 1
+            if r2 != r1 and ls.loads[r2] + segment_load > ls.capacity:
+                continue
+            delta = dist[c, u] + dist[last, d] - dist[c, d] - removal_gain
+            if delta < -ls.improvement_eps:
+                segment = route1[p:p + length]
+                del route1[p:p + length]
+                route2 = routes[r2]
+                target = route2.index(v) + (1 if after else 0)
+                route2[target:target] = segment
+                ls.loads[r1] -= segment_load
+                ls.loads[r2] += segment_load
+                ls._changed(delta, *{r1, r2})
+                ls.count('vns.oropt', evaluated, 1)
+                return True
+    ls.count('vns.oropt', evaluated, 0)
+    return False
+
+@neighborhood('2opt*')
+def two_opt_star(ls, u):
+    """
+    2-opt* (inter-ruta): intercambia las colas de dos rutas para crear el arco (u, v),
+    con 'v' candidato de 'u' en otra ruta: [.., u | nu, ..] y [.., pv | v, ..] pasan a
+    [.., u, v, ..] y [.., pv, nu, ..]. Delta O(1); cargas con sumas acumuladas por ruta.
+    Puede vaciar una ruta (las fusiona).
+    """
+    dist, routes = ls.dist, ls.routes
+    r1, p = ls.route_of[u], ls.pos[u]
+    nu = ls.neighbors(u)[1]
+    prefix1 = ls.route_prefix_loads(r1)
+    head_load1 = prefix1[p + 1]
+    evaluated = 0
+
+    for v in ls.candidates[u]:
+        r2 = ls.route_of[v]
+        if v == 0 or r2 < 0 or r2 == r1:
+            continue
+        evaluated += 1
+        q = ls.pos[v]
+        head_load2 = ls.route_prefix_loads(r2)[q]
+        if head_load1 + ls.loads[r2] - head_load2 > ls.capacity or \
+           head_load2 + ls.loads[r1] - head_load1 > ls.capacity:
+            continue
+        pv = ls.neighbors(v)[0]
+        delta = dist[u, v] + dist[pv, nu] - dist[u, nu] - dist[pv, v]
+        if delta < -ls.improvement_eps:
+            route1, route2 = routes[r1], routes[r2]
+            routes[r1], routes[r2] = route1[:p + 1] + route2[q:], route2[:q] + route1[p + 1:]
+            load1 = head_load1 + ls.loads[r2] - head_load2
+            ls.loads[r1], ls.loads[r2] = load1, ls.loads[r1] + ls.loads[r2] - load1
+            ls._changed(delta, r1, r2)
+            ls.count('vns.2opt*', evaluated, 1)
+            return True
+    ls.count('vns.2opt*', evaluated, 0)
+    return False
+
+def _relocate_moves(ls, u):
+    """
+    Posiciones (ruta, índice) donde probar insertar 'u'. En modo granular, solo justo
+    antes o después de uno de sus candidatos; si no, todas las posiciones de todas las rutas.
+    """
+    routes = ls.routes
+    if not ls.granular:
+        for r2, route in enumerate(routes):
+            if route:
+                for insert_pos in range(len(route) + 1):
+                    yield r2, insert_pos
+        return
+
+    for cand in ls.candidates[u]:
+        if cand == 0:
+            # Junto al depósito: inicio o final de cualquier ruta
+            for r2, route in enumerate(routes):
+                if route:
+                    yield r2, 0
+                    yield r2, len(route)
+        elif ls.route_of[cand] >= 0:
+            r2, pos = ls.route_of[cand], ls.pos[cand]
+            yield r2, pos      # Antes del candidato
+            yield r2, pos + 1  # Después del candidato
+
+def _2opt_moves(path, candidates):
+    """
+    Pares (i, j) de arcos a intercambiar en 'path' = [0] + ruta + [0].
+    En rutas más largas que las listas de candidatos, solo se generan los
+    movimientos que crean un arco entre un nodo y uno de sus candidatos.
+    """
+    last = len(path) - 1
+
+    if len(path) - 2 <= len(candidates[0]):
+        for i in range(last - 2):
+            for j in range(i + 2, last):
+                yield i, j
+        return
+
+    position = {node: t for t, node in enumerate(path[1:-1], start=1)}
+    for t, node in enumerate(path):
+        for cand in candidates[node]:
+            if cand == 0:
+                targets = (0, last)
+            elif cand in position:
+                targets = (position[cand],)
+            else:
+                continue
+
+            for s in targets:
+                lo, hi = (t, s) if t < s else (s, t)
+                # Arco nuevo (node, cand) como (a, c) o como (b, d)
+                if hi - lo >= 2 and hi < last:
+                    yield lo, hi
+                if lo >= 1 and hi - lo >= 2:
+                    yield lo - 1, hi - 1
+
+def _path_prefix_costs(dist, path):
+    """
+    Costos acumulados de 'path' hasta cada posición t: recorrido hacia adelante
+    (path[0] -> path[t]) y con cada arco invertido (path[t] -> path[0]).
+    """
+    forward, backward = [0.0], [0.0]
+    for s in range(len(path) - 1):
+        forward.append(forward[-1] + dist[path[s], path[s+1]])
+        backward.append(backward[-1] + dist[path[s+1], path[s]])
+    return forward, backward
@@ -0,0 +1,121 @@
+from array import array
+import numpy as np
+
+class Solution:
+    """
+    Representación compacta de una solución CVRP.
+    - tour: "giant tour" plano con los clientes de todas las rutas (sin depósitos).
+    - offsets: la ruta r es tour[offsets[r]:offsets[r+1]].
+    - loads / costs: carga y costo de cada ruta, en caché; los movimientos los
+      actualizan de forma incremental en lugar de recorrer las rutas de nuevo.
+    Los arrays son array.array (acceso escalar rápido desde Python y sin copias
+    al verlos desde NumPy con np.frombuffer).
+    """
+    __slots__ = ('tour', 'offsets', 'loads', 'costs')
+
+    def __init__(self, tour, offsets, loads, costs):
+        self.tour = tour
+        self.offsets = offsets
+        self.loads = loads
+        self.costs = costs
+
+    @classmethod
+    def from_routes(cls, routes, problem):
+        """Construye la solución a partir del formato lista de listas (rutas no vacías)."""
+        dist = problem['dist_matrix']
+        demands = problem['demands']
+        tour, offsets, loads, costs = array('q'), array('q', [0]), array('d'), array('d')
+
+        for route in routes:
+            if len(route) == 0:
+                continue
+            nodes = np.asarray(route, dtype=np.intp)
+            tour.extend(nodes.tolist())
+            offsets.append(len(tour))
+            loads.append(float(demands[nodes].sum()))
+            costs.append(float(dist[0, nodes[0]] + dist[nodes[:-1], nodes[1:]].sum() + dist[nodes[-1], 0]))
+        return cls(tour, offsets, loads, costs)
+
+    @classmethod
+    def split_giant_tour(cls, giant_tour, problem):
+        """
+        Divide una permutación de clientes en rutas de forma voraz por capacidad
+        (abre una ruta nueva cuando el siguiente cliente no cabe), en una sola pasada.
+        """
+        dist = problem['dist_matrix']
+        demands = problem['demands']
+        capacity = problem['capacity']
+        tour = array('q', giant_tour)
+        offsets, loads, costs = array('q', [0]), array('d'), array('d')
+
+        load, cost, prev = 0.0, 0.0, 0
+        for pos, node in enumerate(tour):
+            demand = demands[node]
+            if load + demand > capacity and pos > offsets[-1]:
+                # Cerrar la ruta actual (volver al depósito)
+                offsets.append(pos)
+                loads.append(load)
+                costs.append(cost + dist[prev, 0])
+                load, cost, prev = 0.0, 0.0, 0
+            load += demand
+            cost += dist[prev, node]
+            prev = node
+
+        if len(tour) > offsets[-1]:
+            offsets.append(len(tour))
+            loads.append(load)
+            costs.append(cost + dist[prev, 0])
+        return cls(tour, offsets, loads, costs)
+
+    @property
+    def n_routes(self):
+        return len(self.offsets) - 1
+
+    def route(self, r):
+        """Clientes de la ruta r (copia pequeña, como array)."""
+        return self.tour[self.offsets[r]:self.offsets[r + 1]]
+
+    def to_routes(self):
+        """Adaptador al formato lista de listas (plot_routes, feromonas, resultados)."""
+        return [self.tour[self.offsets[r]:self.offsets[r + 1]].tolist() for r in range(self.n_routes)]
+
+    def total_cost(self):
+        return sum(self.costs)
+
+    def copy(self):
+        return Solution(array('q', self.tour), array('q', self.offsets), array('d', self.loads), array('d', self.costs))
+
+    # --------------------------------------------------------------------------
+    # Movimientos (en sitio; el llamador aporta el delta de costo ya calculado)
+    # --------------------------------------------------------------------------
+
+    def insert(self, r, i, node, demand, delta):
+        """
+        Inserta 'node' en la posición i de la ruta r y suma 'delta' a su costo.
+        Con r == n_routes se abre una ruta nueva (delta = d(0, node) + d(node, 0)).
+        """
+        if r == self.n_routes:
+            self.offsets.append(self.offsets[-1])
+            self.loads.append(0.0)
+            self.costs.append(0.0)
+        self.tour.insert(self.offsets[r] + i, node)
+        for k in range(r + 1, len(self.offsets)):
+            self.offsets[k] += 1
+        self.loads[r] += demand
+        self.costs[r] += delta
+
+    def remove(self, r, i, demand, delta):
+        """
+        Quita el cliente en la posición i de la ruta r y suma 'delta' a su costo;
+        elimina r si queda vacía. Devuelve True si se eliminó una ruta.
+        """
+        del self.tour[self.offsets[r] + i]
+        for k in range(r + 1, len(self.offsets)):
+            self.offsets[k] -= 1
+        self.loads[r] -= demand
+        self.costs[r] += delta
+
+        if self.offsets[r] == self.offsets[r + 1]:
+            del self.offsets[r + 1], self.loads[r], self.costs[r]
+            return True
+        return False
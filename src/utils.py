@@ -1,9 +1,18 @@
+import hashlib
 import math
-import plotly.graph_objects as go
+import threading
+from collections import OrderedDict
+from itertools import chain
+import numpy as np
+
+EARTH_RADIUS_KM = 6371  # Radio de la Tierra en km
+DEFAULT_N_CANDIDATES = 20  # Vecinos por nodo en las listas de candidatos
+PACKED_ROUTES_THRESHOLD = 20  # Con más rutas, plot_routes las empaqueta en pocas trazas
+FIGURE_CACHE_SIZE = 32  # Figuras de plot_routes en memoria (LRU)
 
 def get_haversine_distance(lat1, lon1, lat2, lon2):
     """Calcula la distancia en KM entre dos puntos (Lat, Lon)"""
-    R = 6371  # Radio de la Tierra en km
+    R = EARTH_RADIUS_KM
     
     phi1 = math.radians(lat1)
     phi2 = math.radians(lat2)
@@ -18,21 +27,105 @@ def get_haversine_distance(lat1, lon1, lat2, lon2):
     distance = R * c
     return distance
 
+def get_haversine_matrix(lats, lons):
+    """
+    Calcula la matriz completa de distancias Haversine (KM) entre todos los puntos.
+    Versión vectorizada (broadcasting de NumPy) de get_haversine_distance.
+    """
+    return get_haversine_rows(lats, lons, np.arange(len(lats)))
+
+def get_haversine_rows(lats, lons, rows):
+    """
+    Filas 'rows' de la matriz de distancias Haversine (KM): distancias desde esos
+    puntos a todos los demás. Permite construir matrices grandes por bloques.
+    """
+    phi = np.radians(np.asarray(lats, dtype=float))
+    lam = np.radians(np.asarray(lons, dtype=float))
+    rows = np.asarray(rows, dtype=np.intp)
+
+    delta_phi = phi[None, :] - phi[rows, None]
+    delta_lambda = lam[None, :] - lam[rows, None]
+
+    a = np.sin(delta_phi / 2)**2 + \
+        np.cos(phi)[rows, None] * np.cos(phi)[None, :] * \
+        np.sin(delta_lambda / 2)**2
+    # Errores de redondeo pueden dejar 'a' ligeramente fuera de [0, 1]
+    a = np.clip(a, 0.0, 1.0)
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    dist_rows = EARTH_RADIUS_KM * c
+    dist_rows[np.arange(len(rows)), rows] = 0.0
+    return dist_rows
+
+def build_candidate_lists(dist_matrix, k, chunk_size=1024, rows=None):
+    """
+    Listas de candidatos: para cada nodo, sus 'k' vecinos más cercanos (excluyéndose
+    a sí mismo), ordenados por distancia. Devuelve un array de enteros de forma (N, k).
+    Con 'rows' solo se calculan las listas de esos nodos (forma (len(rows), k)).
+    Se procesa por bloques de filas para no duplicar una matriz grande en memoria.
+    """
+    n = dist_matrix.shape[0]
+    k = max(1, min(k, n - 1))
+    rows = np.arange(n) if rows is None else np.asarray(rows, dtype=np.intp)
+    candidates = np.empty((len(rows), k), dtype=np.intp)
+    
+    for start in range(0, len(rows), chunk_size):
+        block_rows = rows[start:start + chunk_size]
+        block = np.array(dist_matrix[block_rows], dtype=float)
+        block[np.arange(len(block_rows)), block_rows] = np.inf # Excluir el propio nodo
+        
+        nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(block, nearest, axis=1), axis=1)
+        candidates[start:start + len(block_rows)] = np.take_along_axis(nearest, order, axis=1)
+        
+    return candidates
+
+def get_candidate_lists(problem, k=None):
+    """
+    Devuelve las listas de candidatos del problema, construyéndolas (y adjuntándolas
+    en problem['candidate_lists']) solo si no existen para ese 'k'.
+    """
+    if k is None:
+        k = DEFAULT_N_CANDIDATES
+    k = max(1, min(k, problem['num_nodes'] - 1))
+    
+    candidates = problem.get('candidate_lists')
+    if candidates is None or candidates.shape[1] != k:
+        candidates = get_derived_array(problem, f'candidates-k{k}',
+                                       lambda: build_candidate_lists(problem['dist_matrix'], k))
+        problem['candidate_lists'] = candidates
+    return candidates
+
+def get_derived_array(problem, name, compute, mmap=False):
+    """
+    Datos derivados de la matriz de distancias (listas de candidatos, heurística...).
+    Si el problema tiene caché en disco (problem['derived_cache'], ver
+    src/data_loader.DerivedDataCache) se leen de ahí o se calculan y guardan una vez;
+    si no, simplemente se calculan.
+    """
+    cache = problem.get('derived_cache')
+    if cache is None:
+        return compute()
+    return cache.get(name, compute, mmap)
+
 def calculate_route_cost(route, dist_matrix):
-    """Calcula el costo (distancia) total de una sola ruta."""
+    """
+    Calcula el costo (distancia) total de una sola ruta.
+    Indexa con dist_matrix[i, j], válido para cualquier almacenamiento (ver src/distance.py).
+    """
     if not route:
         return 0
     
     total_dist = 0
     # Distancia del Depósito (0) al primer cliente
-    total_dist += dist_matrix[0][route[0]]
+    total_dist += dist_matrix[0, route[0]]
     
     # Distancias entre clientes
     for i in range(len(route) - 1):
-        total_dist += dist_matrix[route[i]][route[i+1]]
+        total_dist += dist_matrix[route[i], route[i+1]]
         
     # Distancia del último cliente al Depósito (0)
-    total_dist += dist_matrix[route[-1]][0]
+    total_dist += dist_matrix[route[-1], 0]
     
     return total_dist
 
@@ -40,48 +133,121 @@ def calculate_solution_cost(solution, dist_matrix):
     """Calcula el costo total de una solución (lista de rutas)."""
     return sum(calculate_route_cost(route, dist_matrix) for route in solution)
 
-def plot_routes(solution, problem_data, title):
+ROUTE_COLORS = [
+    "#636EFA", "#EF553B", "#00CC96", "#AB63FA", "#FFA15A",
+    "#19D3F3", "#FF6692", "#B6E880", "#FF97FF", "#FECB52"
+]
+
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()
+
+def _map_trace(euclidean, first, second, **kwargs):
+    """Traza de Plotly: mapa (Lat, Lon) o plano cartesiano (X, Y) para instancias CVRPLIB."""
+    import plotly.graph_objects as go
+    if euclidean:
+        return go.Scatter(x=first, y=second, **kwargs)
+    return go.Scattermapbox(lat=first, lon=second, **kwargs)
+
+def solution_digest(solution, problem_data):
+    """Hash de una solución (rutas) junto con las coordenadas y demandas que se dibujan."""
+    digest = hashlib.sha256()
+    digest.update(_route_paths(solution).tobytes())
+    digest.update(np.ascontiguousarray(problem_data['coords'], dtype=float).tobytes())
+    digest.update(np.ascontiguousarray(problem_data['demands']).tobytes())
+    return digest.hexdigest()
+
+def _route_paths(solution, stride=1):
+    """
+    Todas las rutas en un solo array de índices: depósito, clientes (uno de cada
+    'stride'), depósito y un separador -1 tras cada ruta.
+    """
+    return np.fromiter(chain.from_iterable((0, *route[::stride], 0, -1) for route in solution), dtype=np.int64)
+
+def _path_coords(coords, path):
+    """Coordenadas de un recorrido empaquetado, con NaN en los separadores (cortes de línea)."""
+    points = coords[path]
+    points[path < 0] = np.nan
+    return points[:, 0], points[:, 1]
+
+def plot_routes(solution, problem_data, title, packed=None, max_points=None):
     """
     Crea un mapa interactivo con las rutas usando Plotly.
     Esto responde al Punto 6 del evaluador (calidad de figuras).
+    Las instancias con coordenadas euclidianas (archivos .vrp) se dibujan en un plano X-Y.
+    Con 'packed' (por defecto, si hay más de PACKED_ROUTES_THRESHOLD rutas) todas las
+    rutas van en una traza por color, separadas por NaN, y las paradas se colorean
+    según su ruta; con 'max_points' se dibuja solo uno de cada k clientes para no
+    superar ese número de puntos. Las figuras se guardan por hash de la solución, así
+    que redibujar la misma solución (p. ej. al reejecutarse Streamlit) no las reconstruye.
     """
-    coords = problem_data['coords']
+    if packed is None:
+        packed = len(solution) > PACKED_ROUTES_THRESHOLD
+    key = (solution_digest(solution, problem_data), title, packed, max_points)
+    with _figure_cache_lock:
+        if key in _figure_cache:
+            _figure_cache.move_to_end(key) # Usada recientemente
+            return _figure_cache[key]
+
+    fig = _build_route_figure(solution, problem_data, title, packed, max_points)
+    with _figure_cache_lock:
+        _figure_cache[key] = fig
+        while len(_figure_cache) > FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False) # Descartar la menos usada
+    return fig
+
+def _build_route_figure(solution, problem_data, title, packed, max_points):
+    import plotly.graph_objects as go # Import diferido: los algoritmos y la CLI no cargan Plotly
+    coords = np.asarray(problem_data['coords'], dtype=float)
+    demands = np.asarray(problem_data['demands'])
+    euclidean = problem_data.get('coord_system') == 'euclidean'
+    customer_nodes = np.asarray(problem_data['customer_nodes'], dtype=np.int64)
+
+    # Diezmado: uno de cada 'stride' clientes (en las rutas y en las paradas)
+    stride = 1
+    if max_points and len(customer_nodes) > max_points:
+        stride = math.ceil(len(customer_nodes) / max_points)
     
     fig = go.Figure()
     
-    # Colores para las rutas
-    colors = [
-        "#636EFA", "#EF553B", "#00CC96", "#AB63FA", "#FFA15A",
-        "#19D3F3", "#FF6692", "#B6E880", "#FF97FF", "#FECB52"
-    ]
-    
     # Añadir Depósito
-    fig.add_trace(go.Scattermapbox(
-        lat=[coords[0][0]],
-        lon=[coords[0][1]],
+    depot_name = 'Depósito' if euclidean else 'Depósito (Buga)'
+    fig.add_trace(_map_trace(
+        euclidean,
+        [coords[0][0]],
+        [coords[0][1]],
         mode='markers',
-        marker=go.scattermapbox.Marker(
+        marker=dict(
             size=18,
             color='red',
-            symbol='warehouse'
+            symbol='square' if euclidean else 'warehouse'
         ),
-        name='Depósito (Buga)',
-        text='Depósito (Buga)'
+        name=depot_name,
+        text=depot_name
     ))
     
     # Añadir Nodos de Clientes
-    customer_lats = [coords[i][0] for i in problem_data['customer_nodes']]
-    customer_lons = [coords[i][1] for i in problem_data['customer_nodes']]
-    customer_demands = [problem_data['demands'][i] for i in problem_data['customer_nodes']]
-    customer_text = [f"Parada {i} (Dem: {d})" for i, d in zip(problem_data['customer_nodes'], customer_demands)]
+    stops = customer_nodes[::stride]
+    customer_text = [f"Parada {i} (Dem: {d})" for i, d in zip(stops.tolist(), demands[stops].tolist())]
+    stop_color = 'blue'
+    if packed:
+        # Color de la ruta de cada parada (azul si no está en ninguna)
+        route_of = np.full(len(coords), -1, dtype=np.int64)
+        for r, route in enumerate(solution):
+            route_of[route] = r
+        colors = np.array(ROUTE_COLORS + ['blue'])
+        stop_routes = route_of[stops]
+        stop_color = colors[np.where(stop_routes >= 0, stop_routes % len(ROUTE_COLORS), -1)]
+        customer_text = [f"{text} - Ruta {r + 1}" if r >= 0 else text
+                         for text, r in zip(customer_text, stop_routes.tolist())]
     
-    fig.add_trace(go.Scattermapbox(
-        lat=customer_lats,
-        lon=customer_lons,
+    fig.add_trace(_map_trace(
+        euclidean,
+        coords[stops, 0],
+        coords[stops, 1],
         mode='markers',
-        marker=go.scattermapbox.Marker(
-            size=10,
-            color='blue'
+        marker=dict(
+            size=6 if packed else 10,
+            color=stop_color
         ),
         name='Paradas',
         text=customer_text,
@@ -89,32 +255,54 @@ def plot_routes(solution, problem_data, title):
     ))
     
     # Añadir Rutas
-    for i, route in enumerate(solution):
-        route_color = colors[i % len(colors)]
-        route_lats = [coords[0][0]] + [coords[node][0] for node in route] + [coords[0][0]]
-        route_lons = [coords[0][1]] + [coords[node][1] for node in route] + [coords[0][1]]
-        
-        fig.add_trace(go.Scattermapbox(
-            lat=route_lats,
-            lon=route_lons,
-            mode='lines',
-            line=go.scattermapbox.Line(
-                width=2,
-                color=route_color
-            ),
-            name=f'Ruta {i+1}',
-            hoverinfo='name'
-        ))
+    if packed:
+        # Una traza por color con todas sus rutas, cortadas por NaN
+        for c, route_color in enumerate(ROUTE_COLORS):
+            path = _route_paths(solution[c::len(ROUTE_COLORS)], stride)
+            if not len(path):
+                continue
+            first, second = _path_coords(coords, path)
+            fig.add_trace(_map_trace(
+                euclidean,
+                first,
+                second,
+                mode='lines',
+                line=dict(width=1.5, color=route_color),
+                name='Rutas',
+                legendgroup='routes',
+                showlegend=c == 0,
+                hoverinfo='skip'
+            ))
+    else:
+        for i, route in enumerate(solution):
+            first, second = _path_coords(coords, _route_paths([route], stride)[:-1])
+            fig.add_trace(_map_trace(
+                euclidean,
+                first,
+                second,
+                mode='lines',
+                line=dict(
+                    width=2,
+                    color=ROUTE_COLORS[i % len(ROUTE_COLORS)]
+                ),
+                name=f'Ruta {i+1}',
+                hoverinfo='name'
+            ))
 
     # Actualizar layout del mapa
     fig.update_layout(
         title=title,
-        mapbox_style="open-street-map",
-        mapbox_center_lon=-75.5, # Centrar en Colombia
-        mapbox_center_lat=6.0,
-        mapbox_zoom=4.5,
         margin={"r":0,"t":40,"l":0,"b":0},
         legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01)
     )
+    if euclidean:
+        fig.update_yaxes(scaleanchor="x", scaleratio=1)
+    else:
+        fig.update_layout(
+            mapbox_style="open-street-map",
+            mapbox_center_lon=-75.5, # Centrar en Colombia
+            mapbox_center_lat=6.0,
+            mapbox_zoom=4.5
+        )
     
     return fig